@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None  # type: ignore[assignment]
+
+CACHE_DIR = Path(os.getenv("SMBB_CACHE_DIR", "cache"))
+ASSET_DIR = CACHE_DIR / "assets"
+MANIFEST_PATH = ASSET_DIR / "manifest.json"
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()[:16]
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def lesson_key(topic: str, format_name: str, spoken_text: str) -> str:
+    return f"{topic}|{format_name}|{text_hash(spoken_text)}"
+
+
+def _copy_into(src: Path, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f"{dest.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    shutil.copyfile(src, tmp)
+    tmp.replace(dest)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class AssetManifest:
+    """Produced lesson audio and rendered segments, keyed by (topic, format, script hash)."""
+
+    def __init__(self, path: Path = MANIFEST_PATH) -> None:
+        self.path = path
+        self.root = path.parent
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8")).get("entries", {})
+        except Exception:
+            return {}
+
+    @contextmanager
+    def _update(self) -> Iterator[None]:
+        """Reload, change and save under a file lock; worker processes of several channels share the manifest."""
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with self.path.with_suffix(".lock").open("a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._entries = self._load()
+                yield
+                self._save()
+
+    def _refresh(self) -> None:
+        with self._lock:
+            self._entries = self._load()
+
+    def _save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"entries": self._entries}, indent=2), encoding="utf-8")
+        tmp.replace(self.path)
+
+    def _entry(self, key: str) -> Dict[str, Any]:
+        topic, format_name, script_hash = (key.split("|") + ["", "", ""])[:3]
+        return self._entries.setdefault(
+            key,
+            {"topic": topic, "format": format_name, "script_hash": script_hash, "audio": {}, "segments": {}},
+        )
+
+    def _existing(self, rel: Optional[str]) -> Optional[Path]:
+        if not rel:
+            return None
+        path = self.root / rel
+        return path if path.exists() else None
+
+    def find_audio(self, key: str, voice: str) -> Optional[Path]:
+        with self._lock:
+            found = self._existing(self._entries.get(key, {}).get("audio", {}).get(voice))
+        if found is None:
+            self._refresh()
+            with self._lock:
+                found = self._existing(self._entries.get(key, {}).get("audio", {}).get(voice))
+        return found
+
+    def store_audio(self, key: str, voice: str, src: Path) -> Path:
+        rel = f"audio/{text_hash(key)}_{voice}{src.suffix}"
+        dest = self.root / rel
+        _copy_into(src, dest)
+        with self._update():
+            entry = self._entry(key)
+            entry["audio"][voice] = rel
+            entry["updated"] = _now()
+        return dest
+
+    def _segment(self, key: str, render_key: str) -> Optional[Tuple[Path, Path]]:
+        with self._lock:
+            record = self._entries.get(key, {}).get("segments", {}).get(render_key, {})
+            mp3 = self._existing(record.get("audio"))
+            mp4 = self._existing(record.get("video"))
+        if mp3 and mp4:
+            return mp3, mp4
+        return None
+
+    def find_segment(self, key: str, render_key: str) -> Optional[Tuple[Path, Path]]:
+        found = self._segment(key, render_key)
+        if found is None:
+            self._refresh()
+            found = self._segment(key, render_key)
+        return found
+
+    def store_segment(self, key: str, render_key: str, mp3: Path, mp4: Path) -> None:
+        base = f"segments/{render_key}"
+        for src, suffix in ((mp3, ".mp3"), (mp4, ".mp4")):
+            _copy_into(src, self.root / f"{base}{suffix}")
+        with self._update():
+            entry = self._entry(key)
+            entry["segments"][render_key] = {"audio": f"{base}.mp3", "video": f"{base}.mp4", "created": _now()}
+            entry["updated"] = _now()
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from asset_manifest import CACHE_DIR, file_digest
+from ffmpeg_governor import get_governor
+
+ANALYSIS_DB_PATH = CACHE_DIR / "media_analysis.sqlite3"
+SAMPLE_RATE = 16000
+FRAME_SEC = 0.02
+SILENCE_DBFS = -45.0
+# Syllable nuclei must rise this far above the silence floor to count.
+SYLLABLE_MIN_DBFS = SILENCE_DBFS + 12.0
+CLIP_LEVEL = 0.999
+SYLLABLES_PER_WORD = 1.45
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    fingerprint TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (fingerprint, kind)
+);
+"""
+
+
+def _dbfs(value: float) -> float:
+    return round(20 * float(np.log10(max(value, 1e-10))), 2)
+
+
+def decode_pcm(path: Path) -> np.ndarray:
+    """Mono float32 samples at SAMPLE_RATE, decoded by ffmpeg in one pass."""
+    with get_governor().slot("decode", path.name) as budget:
+        raw = subprocess.run(
+            ["ffmpeg", "-v", "error", *budget.codec_args(), "-i", str(path)]
+            + ["-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"],
+            check=True,
+            capture_output=True,
+        ).stdout
+    return read_pcm(raw)
+
+
+def read_pcm(raw: bytes) -> np.ndarray:
+    return np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def pcm_output_args(path: Path) -> List[str]:
+    """ffmpeg output options that write the PCM analyze() expects, for a second output of an existing run."""
+    return ["-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", str(path)]
+
+
+def analyze_samples(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Dict[str, float]:
+    count = int(samples.size)
+    duration = count / sample_rate
+    if count == 0:
+        return {
+            "duration_sec": 0.0,
+            "rms_dbfs": _dbfs(0.0),
+            "peak_dbfs": _dbfs(0.0),
+            "clipped_ratio": 0.0,
+            "lead_silence_sec": 0.0,
+            "trail_silence_sec": 0.0,
+            "speech_sec": 0.0,
+            "syllables_per_sec": 0.0,
+            "est_words_per_sec": 0.0,
+        }
+
+    magnitude = np.abs(samples)
+    power = np.square(samples, dtype=np.float64)
+    frame = max(1, int(sample_rate * FRAME_SEC))
+    frames = count // frame
+    frame_db = 10 * np.log10(np.maximum(power[: frames * frame].reshape(frames, frame).mean(axis=1), 1e-20))
+    voiced = frame_db > SILENCE_DBFS
+    voiced_at = np.flatnonzero(voiced)
+
+    if voiced_at.size:
+        lead = float(voiced_at[0]) * FRAME_SEC
+        trail = duration - float(voiced_at[-1] + 1) * FRAME_SEC
+    else:
+        lead = trail = duration
+    speech = float(voiced.sum()) * FRAME_SEC
+
+    # Syllable nuclei: local maxima of the smoothed frame energy envelope.
+    envelope = np.convolve(frame_db, np.ones(5) / 5, mode="same")
+    peaks = (
+        (envelope[1:-1] > envelope[:-2]) & (envelope[1:-1] >= envelope[2:]) & (envelope[1:-1] > SYLLABLE_MIN_DBFS)
+    )
+    syllables_per_sec = float(np.count_nonzero(peaks)) / speech if speech else 0.0
+
+    return {
+        "duration_sec": round(duration, 3),
+        "rms_dbfs": _dbfs(float(np.sqrt(power.mean()))),
+        "peak_dbfs": _dbfs(float(magnitude.max())),
+        "clipped_ratio": round(float(np.count_nonzero(magnitude >= CLIP_LEVEL)) / count, 6),
+        "lead_silence_sec": round(lead, 2),
+        "trail_silence_sec": round(max(0.0, trail), 2),
+        "speech_sec": round(speech, 2),
+        "syllables_per_sec": round(syllables_per_sec, 2),
+        "est_words_per_sec": round(syllables_per_sec / SYLLABLES_PER_WORD, 2),
+    }
+
+
+class MediaAnalysisCache:
+    """Analysis results and durations keyed by file content, shared by every process using cache/."""
+
+    def __init__(self, path: Path = ANALYSIS_DB_PATH) -> None:
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def get(self, fingerprint: str, kind: str) -> Optional[Dict[str, float]]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT data FROM analyses WHERE fingerprint = ? AND kind = ?", (fingerprint, kind)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, fingerprint: str, kind: str, data: Dict[str, float]) -> None:
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (fingerprint, kind, data) VALUES (?, ?, ?)",
+                (fingerprint, kind, json.dumps(data)),
+            )
+            conn.commit()
+
+
+_cache: Optional[MediaAnalysisCache] = None
+
+
+def get_cache() -> MediaAnalysisCache:
+    global _cache
+    if _cache is None:
+        _cache = MediaAnalysisCache()
+    return _cache
+
+
+def analyze(path: Path, pcm: Optional[Path] = None) -> Dict[str, float]:
+    """Loudness, clipping, silence and speech-rate figures; ``pcm`` (see pcm_output_args) spares a decode."""
+    fingerprint = file_digest(path)
+    cached = get_cache().get(fingerprint, "audio")
+    if cached is not None:
+        return cached
+    samples = read_pcm(pcm.read_bytes()) if pcm is not None and pcm.exists() else decode_pcm(path)
+    result = analyze_samples(samples)
+    get_cache().put(fingerprint, "audio", result)
+    return result
+
+
+def media_duration(path: Path) -> float:
+    """Container duration from ffprobe, cached by content like analyze()."""
+    fingerprint = file_digest(path)
+    cached = get_cache().get(fingerprint, "duration")
+    if cached is not None:
+        return float(cached["duration_sec"])
+    out = subprocess.check_output(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            str(path),
+        ],
+        text=True,
+    ).strip()
+    duration = float(out)
+    get_cache().put(fingerprint, "duration", {"duration_sec": duration})
+    return duration
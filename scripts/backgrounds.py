@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from asset_manifest import CACHE_DIR
+from audio_analysis import media_duration
+from ffmpeg_governor import get_governor
+from render_profiles import RenderProfile
+
+BACKGROUND_DIR = CACHE_DIR / "backgrounds"
+CLIP_DIR = CACHE_DIR / "clips"
+
+PALETTES: Dict[str, Tuple[str, str]] = {
+    "navy": ("0x0E2447", "0x2E63B0"),
+    "emerald": ("0x0B3B2E", "0x1F8A63"),
+    "graphite": ("0x1B1D22", "0x4A5160"),
+}
+DEFAULT_PALETTE = os.getenv("BACKGROUND_PALETTE", "navy")
+
+LOOP_SEC = 8.0
+LOOP_FADE_SEC = 1.0
+CLIP_LOOP_MAX_SEC = 12.0
+
+GRADIENT_GRADE = "noise=alls=8:allf=t+u,eq=contrast=1.05:brightness=0.08:saturation=1.20"
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def run(cmd: List[str]) -> None:
+    subprocess.run(cmd, check=True)
+
+
+def _path_lock(path: Path) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(str(path), threading.Lock())
+
+
+def clip_grade(profile: RenderProfile) -> str:
+    return (
+        f"scale={profile.width}:{profile.height}:force_original_aspect_ratio=increase,"
+        f"crop={profile.width}:{profile.height},"
+        "eq=contrast=1.07:brightness=0.02:saturation=1.12"
+    )
+
+
+def gradient_source(profile: RenderProfile, duration: float, palette: str = "") -> str:
+    c0, c1 = PALETTES.get(palette or DEFAULT_PALETTE, PALETTES["navy"])
+    return (
+        f"gradients=s={profile.width}x{profile.height}:c0={c0}:c1={c1}:"
+        f"x0=0:y0=0:x1={profile.width}:y1={profile.height}:type=linear:speed=0.012:"
+        f"d={duration:.2f}:r={profile.fps}"
+    )
+
+
+def seamless_loop_filter(length: float, fade: float) -> str:
+    # Plays [fade, length + fade) and crossfades its tail into [0, fade), so the
+    # last frame leads straight back into the first one under -stream_loop.
+    return (
+        "[0:v]split[a][b];"
+        f"[a]trim=start={fade:.3f}:end={length + fade:.3f},setpts=PTS-STARTPTS[body];"
+        f"[b]trim=start=0:end={fade:.3f},setpts=PTS-STARTPTS[head];"
+        f"[body][head]xfade=transition=fade:duration={fade:.3f}:offset={length - fade:.3f}"
+    )
+
+
+def encode_loop(
+    input_args: List[str],
+    output: Path,
+    profile: RenderProfile,
+    grade: str,
+    length: float = LOOP_SEC,
+    fade: float = LOOP_FADE_SEC,
+) -> Path:
+    with _path_lock(output):
+        if output.exists():
+            return output
+        output.parent.mkdir(parents=True, exist_ok=True)
+        tmp = output.with_name(f"{output.stem}.{os.getpid()}.part.mp4")
+        with get_governor().slot("encode", output.name) as budget:
+            run(
+                [
+                    "ffmpeg",
+                    "-y",
+                    *budget.global_args(),
+                    *budget.codec_args(),
+                    *input_args,
+                    "-filter_complex",
+                    f"{seamless_loop_filter(length, fade)},{grade},format=yuv420p[v]",
+                    "-map",
+                    "[v]",
+                    "-an",
+                    "-r",
+                    str(profile.fps),
+                    "-c:v",
+                    "libx264",
+                    "-preset",
+                    "medium",
+                    "-crf",
+                    "18",
+                    "-g",
+                    str(profile.fps),
+                    "-pix_fmt",
+                    "yuv420p",
+                    *budget.codec_args(),
+                    str(tmp),
+                ]
+            )
+        tmp.replace(output)
+    return output
+
+
+def ensure_gradient_loop(profile: RenderProfile, palette: str = "") -> Optional[Path]:
+    name = palette or DEFAULT_PALETTE
+    output = BACKGROUND_DIR / f"gradient_{name}_{profile.width}x{profile.height}_{profile.fps}.mp4"
+    if output.exists():
+        return output
+    try:
+        print(f"Pre-rendering gradient loop for palette '{name}'")
+        return encode_loop(
+            ["-f", "lavfi", "-i", gradient_source(profile, LOOP_SEC + LOOP_FADE_SEC, name)],
+            output,
+            profile,
+            GRADIENT_GRADE,
+        )
+    except subprocess.CalledProcessError as exc:
+        print(f"Gradient loop pre-render failed, using live gradient: {exc}")
+        return None
+
+
+def clip_cache_path(clip_id: str) -> Path:
+    return CLIP_DIR / f"{clip_id}.mp4"
+
+
+def ingest_clip(clip: Path, profile: RenderProfile) -> Optional[Path]:
+    """Transcode a cached stock clip once into a canvas-sized, graded, loopable intermediate."""
+    output = clip.with_name(f"{clip.stem}.{profile.width}x{profile.height}_{profile.fps}.norm.mp4")
+    if output.exists():
+        return output
+    try:
+        duration = media_duration(clip)
+        fade = min(LOOP_FADE_SEC, duration / 4)
+        length = min(CLIP_LOOP_MAX_SEC, duration - fade)
+        if length <= fade:
+            return None
+        print(f"Ingesting clip {clip.name} ({length:.1f}s loop)")
+        return encode_loop(["-i", str(clip)], output, profile, clip_grade(profile), length, fade)
+    except (subprocess.CalledProcessError, ValueError) as exc:
+        print(f"Clip ingest failed for {clip.name}, using raw clip: {exc}")
+        return None
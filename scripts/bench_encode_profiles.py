@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from audio_analysis import media_duration
+from generate_video import build_visual_filter, render_ffmpeg, run
+from render_profiles import RENDER_PROFILES, get_profile
+
+BENCH_DIR = Path("out/bench")
+
+
+def make_bench_audio(path: Path, seconds: float) -> None:
+    run(
+        [
+            "ffmpeg",
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            f"sine=frequency=220:sample_rate=44100:duration={seconds:.2f}",
+            "-ac",
+            "2",
+            "-b:a",
+            "192k",
+            str(path),
+        ]
+    )
+
+
+def bench_profile(name: str, audio: Path, seconds: float) -> Dict[str, object]:
+    profile = get_profile(name)
+    mp4 = BENCH_DIR / f"bench_{name}.mp4"
+    vf = build_visual_filter(
+        title="Encode profile benchmark",
+        srt_path=BENCH_DIR / "none.srt",
+        use_background_video=False,
+        include_subtitles=False,
+        profile=profile,
+    )
+
+    started = time.perf_counter()
+    render_ffmpeg(audio, mp4, vf, seconds, None, profile)
+    encode_sec = time.perf_counter() - started
+
+    size_bytes = mp4.stat().st_size
+    duration = media_duration(mp4)
+    return {
+        "profile": name,
+        "encode_sec": round(encode_sec, 2),
+        "realtime_factor": round(duration / encode_sec, 2) if encode_sec > 0 else 0.0,
+        "size_bytes": size_bytes,
+        "bytes_per_sec": round(size_bytes / duration) if duration > 0 else 0,
+        "budget_bytes_per_sec": profile.max_bytes_per_sec,
+        "within_budget": profile.within_budget(size_bytes, duration),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Encode time vs output size for each render profile")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Length of the synthetic clip")
+    parser.add_argument("--profiles", default=",".join(RENDER_PROFILES), help="Comma-separated profile names")
+    args = parser.parse_args()
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    audio = BENCH_DIR / "bench_audio.mp3"
+    make_bench_audio(audio, args.seconds)
+
+    results: List[Dict[str, object]] = []
+    for name in [item.strip() for item in args.profiles.split(",") if item.strip()]:
+        results.append(bench_profile(name, audio, args.seconds))
+
+    print(f"{'profile':<10} {'encode s':>9} {'x rt':>6} {'size MB':>8} {'B/s':>10} {'budget':>10}")
+    for row in results:
+        budget = row["budget_bytes_per_sec"] or "-"
+        print(
+            f"{row['profile']:<10} {row['encode_sec']:>9} {row['realtime_factor']:>6} "
+            f"{int(row['size_bytes']) / 1e6:>8.2f} {row['bytes_per_sec']:>10} {budget:>10}"
+        )
+
+    (BENCH_DIR / "encode_profiles.json").write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
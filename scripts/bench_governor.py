@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from bench_encode_profiles import BENCH_DIR, make_bench_audio
+from ffmpeg_governor import CALIBRATION_PATH, FfmpegGovernor, Host, detect_host, set_governor
+from generate_video import build_visual_filter, render_ffmpeg
+from render_profiles import get_profile
+
+
+def candidate_splits(cores: int) -> List[Tuple[int, int]]:
+    """jobs x threads pairs that fill the cores: 1 x cores, 2 x cores/2, 4 x cores/4, ... cores x 1."""
+    splits: List[Tuple[int, int]] = []
+    jobs = 1
+    while jobs < cores:
+        splits.append((jobs, cores // jobs))
+        jobs *= 2
+    splits.append((cores, 1))
+    return splits
+
+
+def bench_split(
+    jobs: int, threads: int, audio: Path, seconds: float, videos: int, background: Optional[Path], host: Host
+) -> Dict[str, object]:
+    governor = FfmpegGovernor(host=host, encode_threads=threads)
+    set_governor(governor)
+    profile = get_profile()
+    vf = build_visual_filter(
+        title="Governor calibration",
+        srt_path=BENCH_DIR / "none.srt",
+        use_background_video=background is not None,
+        include_subtitles=False,
+        profile=profile,
+    )
+
+    def render(index: int) -> None:
+        mp4 = BENCH_DIR / f"governor_{jobs}x{threads}_{index}.mp4"
+        render_ffmpeg(audio, mp4, vf, seconds, background, profile)
+        mp4.unlink(missing_ok=True)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        list(pool.map(render, range(videos)))
+    wall_sec = time.perf_counter() - started
+
+    report = governor.report()
+    return {
+        "jobs": jobs,
+        "threads": threads,
+        "videos": videos,
+        "wall_sec": round(wall_sec, 2),
+        "videos_per_hour": round(videos * 3600 / wall_sec, 1) if wall_sec > 0 else 0.0,
+        "utilization": report.get("utilization", 0.0),
+        "load_1m": report.get("load_1m", 0.0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Find the renders x ffmpeg threads split with the best throughput")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Length of each synthetic video")
+    parser.add_argument("--videos", type=int, default=0, help="Videos per split (default: one per core)")
+    parser.add_argument("--splits", default="", help="Comma-separated JOBSxTHREADS, e.g. 1x8,2x4,4x2")
+    parser.add_argument("--background", default="", help="Background clip to loop, to include decode cost")
+    parser.add_argument("--no-save", action="store_true", help=f"Do not write {CALIBRATION_PATH}")
+    args = parser.parse_args()
+
+    host = detect_host()
+    if args.splits:
+        splits = [tuple(int(n) for n in item.lower().split("x")) for item in args.splits.split(",") if item.strip()]
+    else:
+        splits = candidate_splits(host.cores)
+    videos = args.videos or host.cores
+    background = Path(args.background) if args.background else None
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    audio = BENCH_DIR / "bench_audio.mp3"
+    make_bench_audio(audio, args.seconds)
+    print(f"Host: {host.cores} core(s), {host.mem_mb} MB available; {videos} video(s) per split")
+
+    results: List[Dict[str, object]] = []
+    for jobs, threads in splits:
+        results.append(bench_split(jobs, threads, audio, args.seconds, videos, background, host))
+        row = results[-1]
+        print(
+            f"{jobs:>3} job(s) x {threads:>2} thread(s): {row['wall_sec']:>8}s wall, "
+            f"{row['videos_per_hour']:>8} videos/h, {row['utilization']:.0%} utilized"
+        )
+
+    best = max(results, key=lambda row: row["videos_per_hour"])
+    print(f"Best: {best['jobs']} job(s) x {best['threads']} thread(s) at {best['videos_per_hour']} videos/h")
+    (BENCH_DIR / "governor.json").write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if not args.no_save:
+        calibration = {
+            "host": host.to_dict(),
+            "jobs": best["jobs"],
+            "threads": best["threads"],
+            "videos_per_hour": best["videos_per_hour"],
+            "seconds": args.seconds,
+            "profile": get_profile().name,
+            "measured_at": datetime.now(timezone.utc).isoformat(),
+        }
+        CALIBRATION_PATH.parent.mkdir(parents=True, exist_ok=True)
+        CALIBRATION_PATH.write_text(json.dumps(calibration, indent=2), encoding="utf-8")
+        print(f"Saved calibration to {CALIBRATION_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import subprocess
+import textwrap
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from ffmpeg_governor import get_governor
+from render_profiles import RenderProfile
+
+FONT_BOLD = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+TITLE_BOX = (60, 130, 960, 230)  # x, y, w, h on the 1080x1920 canvas
+TITLE_TEXT_Y = 55
+TITLE_FONT_SIZE = 56
+TITLE_SHOW_SEC = 3.8
+
+CAPTION_CARD_HEIGHT = 260
+CAPTION_BOTTOM_OFFSET = 305
+CAPTION_FONT_SIZE = 54
+CAPTION_WRAP_CHARS = 24
+
+Cue = Tuple[float, float, str]
+
+
+@dataclass(frozen=True)
+class OverlayTrack:
+    title_card: Path
+    title_xy: Tuple[int, int]
+    caption_list: Path
+    caption_y: int
+    cue_count: int
+    card_count: int
+
+
+def run(cmd: List[str]) -> None:
+    subprocess.run(cmd, check=True, capture_output=True)
+
+
+def _filter_path(path: Path) -> str:
+    return path.as_posix().replace(":", r"\:")
+
+
+def _srt_seconds(stamp: str) -> float:
+    h, m, rest = stamp.strip().split(":")
+    s, ms = rest.split(",")
+    return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000
+
+
+def parse_srt(path: Path) -> List[Cue]:
+    cues: List[Cue] = []
+    blocks = re.split(r"\n\s*\n", path.read_text(encoding="utf-8").strip())
+    for block in blocks:
+        lines = [ln for ln in block.splitlines() if ln.strip()]
+        timing = next((ln for ln in lines if "-->" in ln), "")
+        if not timing:
+            continue
+        start, end = timing.split("-->")
+        text = " ".join(lines[lines.index(timing) + 1 :]).strip()
+        if text:
+            cues.append((_srt_seconds(start), _srt_seconds(end), text))
+    return cues
+
+
+def _writer_id() -> str:
+    return f"{os.getpid()}-{threading.get_ident()}"
+
+
+def _card_name(kind: str, text: str, profile: RenderProfile) -> str:
+    key = f"{kind}|{profile.width}x{profile.height}|{text}"
+    return f"{kind}_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}.png"
+
+
+def _draw_lines(lines: List[str], card_dir: Path, stem: str, font_size: int, border: int, top: int) -> List[str]:
+    filters: List[str] = []
+    line_height = int(font_size * 1.25)
+    for idx, line in enumerate(lines):
+        text_file = card_dir / f"{stem}_{idx}.txt"
+        if not text_file.exists():
+            tmp = text_file.with_name(f"{text_file.name}.{_writer_id()}")
+            tmp.write_text(line, encoding="utf-8")
+            tmp.replace(text_file)
+        filters.append(
+            f"drawtext=fontfile={FONT_BOLD}:textfile='{_filter_path(text_file)}':expansion=none:"
+            f"fontcolor=white:fontsize={font_size}:borderw={border}:bordercolor=black:"
+            f"x=(w-text_w)/2:y={top + idx * line_height}"
+        )
+    return filters
+
+
+def _render_card(output: Path, width: int, height: int, filters: List[str]) -> Path:
+    if output.exists():
+        return output
+    # Renders of several voices share one card directory and may race on the same card.
+    tmp = output.with_name(f"{output.stem}.{_writer_id()}.part.png")
+    with get_governor().slot("light", output.name) as budget:
+        run(
+            [
+                "ffmpeg",
+                "-y",
+                *budget.global_args(),
+                "-f",
+                "lavfi",
+                "-i",
+                f"color=c=black@0.0:s={width}x{height}:d=1,format=rgba",
+                "-vf",
+                ",".join(filters + ["format=rgba"]),
+                "-frames:v",
+                "1",
+                *budget.codec_args(),
+                str(tmp),
+            ]
+        )
+    tmp.replace(output)
+    return output
+
+
+def render_title_card(title: str, card_dir: Path, profile: RenderProfile) -> Path:
+    px = profile.px
+    _, _, box_w, box_h = TITLE_BOX
+    output = card_dir / _card_name("title", title, profile)
+    filters = ["drawbox=x=0:y=0:w=iw:h=ih:color=black@0.35:t=fill"]
+    filters += _draw_lines([title], card_dir, output.stem, px(TITLE_FONT_SIZE), 0, px(TITLE_TEXT_Y))
+    return _render_card(output, px(box_w), px(box_h), filters)
+
+
+def render_caption_card(text: str, card_dir: Path, profile: RenderProfile) -> Path:
+    px = profile.px
+    output = card_dir / _card_name("cap", text, profile)
+    lines = textwrap.wrap(text, CAPTION_WRAP_CHARS) or [text]
+    font_size = px(CAPTION_FONT_SIZE)
+    block = int(font_size * 1.25) * len(lines)
+    top = max(0, (px(CAPTION_CARD_HEIGHT) - block) // 2)
+    filters = _draw_lines(lines, card_dir, output.stem, font_size, max(1, px(3)), top)
+    return _render_card(output, profile.width, px(CAPTION_CARD_HEIGHT), filters)
+
+
+def write_caption_list(list_path: Path, cues: List[Cue], cards: Dict[str, Path], blank: Path) -> None:
+    entries: List[Tuple[Path, float]] = []
+    cursor = 0.0
+    for start, end, text in cues:
+        if start > cursor + 0.001:
+            entries.append((blank, start - cursor))
+        entries.append((cards[text], max(0.04, end - start)))
+        cursor = max(cursor, end)
+    entries.append((blank, 1.0))
+
+    lines = ["ffconcat version 1.0"]
+    for path, duration in entries:
+        lines.append(f"file '{path.resolve().as_posix()}'")
+        lines.append(f"duration {duration:.3f}")
+    # The concat demuxer ignores the duration of the final entry unless it is repeated.
+    lines.append(f"file '{entries[-1][0].resolve().as_posix()}'")
+    list_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def build_overlay_track(title: str, srt_path: Path, card_dir: Path, profile: RenderProfile) -> OverlayTrack:
+    """Rasterize the title card and each distinct caption once, ahead of the main encode."""
+    card_dir.mkdir(parents=True, exist_ok=True)
+    cues = parse_srt(srt_path)
+    if not cues:
+        raise RuntimeError(f"No caption cues in {srt_path}")
+
+    cards: Dict[str, Path] = {}
+    for _, _, text in cues:
+        if text not in cards:
+            cards[text] = render_caption_card(text, card_dir, profile)
+    blank_card = card_dir / _card_name("blank", "", profile)
+    blank = _render_card(blank_card, profile.width, profile.px(CAPTION_CARD_HEIGHT), ["null"])
+
+    path_id = hashlib.sha256(srt_path.resolve().as_posix().encode("utf-8")).hexdigest()[:8]
+    list_path = card_dir / f"{srt_path.stem}_{path_id}_captions.ffconcat"
+    write_caption_list(list_path, cues, cards, blank)
+
+    box_x, box_y, _, _ = TITLE_BOX
+    return OverlayTrack(
+        title_card=render_title_card(title, card_dir, profile),
+        title_xy=(profile.px(box_x), profile.px(box_y)),
+        caption_list=list_path,
+        caption_y=profile.height - profile.px(CAPTION_BOTTOM_OFFSET),
+        cue_count=len(cues),
+        card_count=len(cards),
+    )
+
+
+def overlay_inputs(track: OverlayTrack) -> List[str]:
+    return [
+        "-loop",
+        "1",
+        "-i",
+        str(track.title_card),
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        str(track.caption_list),
+    ]
+
+
+def overlay_graph(base_filters: List[str], track: OverlayTrack, title_input: int, caption_input: int) -> str:
+    base = ",".join(base_filters) if base_filters else "null"
+    title_x, title_y = track.title_xy
+    return (
+        f"[0:v]{base}[base];"
+        f"[base][{title_input}:v]overlay=x={title_x}:y={title_y}:enable='lt(t,{TITLE_SHOW_SEC})'[titled];"
+        f"[titled][{caption_input}:v]overlay=x=0:y={track.caption_y}:eof_action=pass,format=yuv420p[v]"
+    )
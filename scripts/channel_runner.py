@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from channels import Channel, get_channel, list_channels
+from ffmpeg_governor import calibrated_jobs, detect_host
+from workspace import Workspace
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+# bench_governor measures the best number of concurrent renders for this host.
+CHANNEL_WORKERS = int(os.getenv("CHANNEL_WORKERS", "0") or 0) or calibrated_jobs(max(1, (os.cpu_count() or 2) // 2))
+CHANNEL_REPORT_PATH = Path("out/channel_report.json")
+LOG_TAIL_LINES = 20
+
+
+@dataclass
+class ChannelJob:
+    channel: Channel
+    job_id: str
+    mode: str
+    queued: float
+    started: float = 0.0
+    finished: float = 0.0
+    ok: bool = False
+    error: str = ""
+
+    @property
+    def latency_sec(self) -> float:
+        return self.finished - self.queued
+
+    @property
+    def run_sec(self) -> float:
+        return self.finished - self.started
+
+
+def plan_jobs(channels: List[Channel], mode: str, per_channel: int) -> List[ChannelJob]:
+    """Jobs interleaved round-robin so one channel's backlog never starves the others."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    now = time.monotonic()
+    return [
+        ChannelJob(channel, f"{channel.name}-{mode}-{stamp}-{index}", mode, now)
+        for index in range(per_channel)
+        for channel in channels
+    ]
+
+
+def run_channel_job(job: ChannelJob, scratch: str, targets: List[str]) -> ChannelJob:
+    """Render (and optionally upload) one job in a worker process with the channel's environment."""
+    env = job.channel.env()
+    env.update({"SMBB_JOB_ID": job.job_id, "VIDEO_MODE": job.mode})
+    if scratch:
+        env["SMBB_SCRATCH_DIR"] = scratch
+    log_path = Workspace.create(job.job_id).root / "worker.log"
+    commands = [[sys.executable, str(SCRIPTS_DIR / "generate_video.py"), "--job", job.job_id]]
+    for target in targets:
+        if target == "tiktok" and not env.get("TIKTOK_ACCESS_TOKEN", "").strip():
+            continue
+        commands.append([sys.executable, str(SCRIPTS_DIR / f"upload_{target}.py"), "--job", job.job_id])
+
+    job.started = time.monotonic()
+    print(f"[{job.channel.name}] {job.job_id} started")
+    try:
+        with log_path.open("w", encoding="utf-8") as log:
+            for cmd in commands:
+                subprocess.run(cmd, env=env, stdout=log, stderr=subprocess.STDOUT, check=True)
+        job.ok = True
+    except subprocess.CalledProcessError as exc:
+        job.error = f"{Path(exc.cmd[1]).name} exited with {exc.returncode}"
+        tail = log_path.read_text(encoding="utf-8", errors="replace").splitlines()[-LOG_TAIL_LINES:]
+        print(f"[{job.channel.name}] {job.job_id} failed: {job.error}\n" + "\n".join(tail))
+    job.finished = time.monotonic()
+    print(f"[{job.channel.name}] {job.job_id} {'done' if job.ok else 'failed'} in {job.run_sec:.1f}s")
+    return job
+
+
+def channel_report(jobs: List[ChannelJob], wall_sec: float, workers: int) -> Dict[str, object]:
+    channels: Dict[str, Dict[str, object]] = {}
+    for name in dict.fromkeys(job.channel.name for job in jobs):
+        mine = [job for job in jobs if job.channel.name == name]
+        done = [job for job in mine if job.ok]
+        latencies = [job.latency_sec for job in done]
+        channels[name] = {
+            "jobs": len(mine),
+            "ok": len(done),
+            "failed": {job.job_id: job.error for job in mine if not job.ok},
+            "videos_per_hour": round(len(done) * 3600 / wall_sec, 2) if wall_sec > 0 else 0.0,
+            "latency_sec_mean": round(statistics.mean(latencies), 1) if latencies else 0.0,
+            "latency_sec_max": round(max(latencies), 1) if latencies else 0.0,
+            "run_sec_mean": round(statistics.mean(job.run_sec for job in done), 1) if done else 0.0,
+        }
+    ok = sum(1 for job in jobs if job.ok)
+    return {
+        "host": detect_host().to_dict(),
+        "workers": workers,
+        "wall_sec": round(wall_sec, 1),
+        "videos_per_hour": round(ok * 3600 / wall_sec, 2) if wall_sec > 0 else 0.0,
+        "channels": channels,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render every channel's videos on one shared worker pool")
+    parser.add_argument("--channels", default="", help="Comma-separated channel names (default: all in channels/)")
+    parser.add_argument("--mode", default=os.getenv("VIDEO_MODE", "short").strip().lower())
+    parser.add_argument("--jobs", type=int, default=1, help="Videos per channel")
+    parser.add_argument("--workers", type=int, default=CHANNEL_WORKERS, help="Concurrent worker processes")
+    parser.add_argument("--scratch", default=os.getenv("SMBB_SCRATCH_DIR", ""), help="Scratch base, or 'tmpfs'")
+    parser.add_argument("--publish", default="", help="Upload targets after rendering, e.g. youtube,tiktok")
+    parser.add_argument("--report", default=str(CHANNEL_REPORT_PATH))
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.channels.split(",") if name.strip()]
+    channels = [get_channel(name) for name in names] if names else list_channels() or [get_channel("")]
+    targets = [target.strip() for target in args.publish.split(",") if target.strip()]
+    jobs = plan_jobs(channels, args.mode, args.jobs)
+    workers = max(1, min(args.workers, len(jobs)))
+    print(f"Channels: {', '.join(channel.name for channel in channels)}; {len(jobs)} job(s) on {workers} worker(s)")
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        done = list(pool.map(lambda job: run_channel_job(job, args.scratch, targets), jobs))
+    report = channel_report(done, time.monotonic() - started, workers)
+
+    report_path = Path(args.report)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    for name, stats in report["channels"].items():
+        print(
+            f"{name}: {stats['ok']}/{stats['jobs']} ok, {stats['videos_per_hour']} videos/h, "
+            f"latency {stats['latency_sec_mean']}s mean / {stats['latency_sec_max']}s max"
+        )
+    print(f"Total: {report['videos_per_hour']} videos/h over {report['wall_sec']}s")
+    if any(not job.ok for job in done):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+CHANNELS_DIR = Path(os.getenv("SMBB_CHANNELS_DIR", "channels"))
+DEFAULT_BRAND = "Silent Money Blueprint"
+
+# Credential references name the environment variable (or file) holding the secret;
+# profiles never contain the secret itself. Each maps to the variable the uploaders read.
+CREDENTIAL_ENV = {
+    "youtube_refresh_token": "YOUTUBE_REFRESH_TOKEN",
+    "tiktok_access_token": "TIKTOK_ACCESS_TOKEN",
+}
+CREDENTIAL_FILES = {
+    "youtube_client_secret": "YOUTUBE_CLIENT_SECRET_FILE",
+}
+
+
+@dataclass(frozen=True)
+class Channel:
+    """One publishing channel; empty fields keep the repository defaults."""
+
+    name: str
+    brand: str = DEFAULT_BRAND
+    topics: str = ""
+    ctas: Tuple[str, ...] = ()
+    voices: Tuple[str, ...] = ()
+    voice_variants: Tuple[str, ...] = ()
+    render_profile: str = ""
+    video_variants: Tuple[str, ...] = ()
+    palette: str = ""
+    history_db: str = ""
+    credentials: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def is_default(self) -> bool:
+        return self.name == "default"
+
+    def env(self, base: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Environment for a worker process rendering or uploading for this channel."""
+        env = dict(os.environ if base is None else base)
+        env["SMBB_CHANNEL"] = self.name
+        settings = {
+            "TOPICS_PATH": self.topics,
+            "RENDER_PROFILE": self.render_profile,
+            "VIDEO_VARIANTS": ",".join(self.video_variants),
+            "VOICE_VARIANTS": ",".join(self.voice_variants),
+            "BACKGROUND_PALETTE": self.palette,
+            "SMBB_HISTORY_DB": self.history_db or ("" if self.is_default else f"out/history_{self.name}.sqlite3"),
+        }
+        env.update({key: value for key, value in settings.items() if value})
+        # Another channel must never post with the default channel's credentials.
+        for ref, target in CREDENTIAL_ENV.items():
+            source = self.credentials.get(ref)
+            if source:
+                env[target] = env.get(source, "")
+            elif not self.is_default:
+                env[target] = ""
+        for ref, target in CREDENTIAL_FILES.items():
+            if self.credentials.get(ref):
+                env[target] = self.credentials[ref]
+            elif not self.is_default:
+                env[target] = ""
+        return env
+
+
+def _as_tuple(value: Any, key: str, path: Path) -> Tuple[str, ...]:
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(item, str) and item.strip() for item in value):
+        raise ValueError(f"{path}: '{key}' must be a list of non-empty strings")
+    return tuple(item.strip() for item in value)
+
+
+def load_channel(path: Path) -> Channel:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: channel profile must be a JSON object")
+    name = str(data.pop("name", path.stem)).strip()
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", name):
+        raise ValueError(f"{path}: channel name '{name}' may only use letters, digits, '_' and '-'")
+
+    known = set(Channel.__dataclass_fields__) - {"name"}
+    unknown = sorted(set(data) - known)
+    if unknown:
+        raise ValueError(f"{path}: unknown channel fields {', '.join(unknown)}")
+
+    credentials = data.pop("credentials", {})
+    if not isinstance(credentials, dict):
+        raise ValueError(f"{path}: 'credentials' must be an object")
+    unknown = sorted(set(credentials) - set(CREDENTIAL_ENV) - set(CREDENTIAL_FILES))
+    if unknown:
+        raise ValueError(f"{path}: unknown credential references {', '.join(unknown)}")
+
+    for key in ("ctas", "voices", "voice_variants", "video_variants"):
+        if key in data:
+            data[key] = _as_tuple(data[key], key, path)
+    return Channel(name=name, credentials={key: str(value) for key, value in credentials.items()}, **data)
+
+
+def list_channels(root: Path = CHANNELS_DIR) -> List[Channel]:
+    channels = [load_channel(path) for path in sorted(root.glob("*.json"))]
+    names = [channel.name for channel in channels]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate channel names in {root}: {', '.join(duplicates)}")
+    return channels
+
+
+def get_channel(name: str, root: Path = CHANNELS_DIR) -> Channel:
+    if not name or name == "default":
+        return Channel(name="default")
+    for channel in list_channels(root):
+        if channel.name == name:
+            return channel
+    raise ValueError(f"Unknown channel '{name}' (profiles live in {root}/)")
+
+
+_current: Optional[Channel] = None
+
+
+def current_channel() -> Channel:
+    """The channel this process works for (SMBB_CHANNEL), or the default one."""
+    global _current
+    if _current is None:
+        _current = get_channel(os.getenv("SMBB_CHANNEL", "").strip())
+    return _current
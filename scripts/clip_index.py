@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from asset_manifest import CACHE_DIR
+from topic_corpus import TopicCorpus, get_corpus
+
+CLIP_INDEX_PATH = CACHE_DIR / "clip_index.sqlite3"
+# After this many showings a clip makes way for fresh footage from the topic's next query.
+CLIP_MAX_USES = int(os.getenv("CLIP_MAX_USES", "5"))
+MAX_QUERIES = 6
+
+# Stock-footage searches that film well, keyed by a word that signals the idea.
+# Keywords match whole words or their start ("budget" matches "budgeting").
+VISUAL_QUERIES: Dict[str, Tuple[str, ...]] = {
+    "saving": ("piggy bank coins", "saving money jar"),
+    "emergency": ("savings jar coins", "car repair garage"),
+    "debt": ("credit card bills", "stressed person bills"),
+    "credit": ("credit card payment", "credit card shopping"),
+    "apr": ("credit card bills",),
+    "interest": ("coins stacking", "bank building"),
+    "invest": ("stock market chart", "investing app phone"),
+    "index": ("stock market chart", "trading screen"),
+    "market": ("stock market chart", "trading screen"),
+    "stock": ("stock market chart",),
+    "fees": ("calculator desk",),
+    "budget": ("person budgeting notebook", "calculator desk"),
+    "spending": ("shopping bags street", "card payment terminal"),
+    "lifestyle": ("luxury car street", "shopping bags street"),
+    "salary": ("office laptop finance", "paycheck envelope"),
+    "payday": ("paycheck envelope", "phone banking app"),
+    "transfer": ("phone banking app",),
+    "automatic": ("phone banking app",),
+    "retirement": ("retired couple walking", "old couple beach"),
+    "compound": ("growing plant coins", "coins stacking"),
+    "inflation": ("supermarket prices", "shopping cart supermarket"),
+    "liquidity": ("cash wallet", "atm cash withdrawal"),
+    "cash": ("cash wallet",),
+    "safety": ("umbrella rain city",),
+    "habit": ("morning routine desk",),
+}
+# How strongly a keyword in each topic field speaks for the footage.
+FIELD_WEIGHTS: Dict[str, float] = {"topic": 4.0, "tags": 3.0, "concept": 3.0, "comparison": 1.0, "quick_tip": 0.5}
+GENERIC_QUERIES = ("financial planning", "money saving", "calculator desk")
+QUERY_VERSION = hashlib.sha256(
+    json.dumps([VISUAL_QUERIES, FIELD_WEIGHTS, GENERIC_QUERIES, MAX_QUERIES], sort_keys=True).encode("utf-8")
+).hexdigest()[:12]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS topic_queries (
+    corpus TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    query TEXT NOT NULL,
+    PRIMARY KEY (corpus, topic, rank)
+);
+CREATE TABLE IF NOT EXISTS clips (
+    clip_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    added TEXT NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    last_used TEXT
+);
+CREATE TABLE IF NOT EXISTS clip_queries (
+    query TEXT NOT NULL,
+    clip_id TEXT NOT NULL,
+    PRIMARY KEY (query, clip_id)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z]+", text.lower())
+
+
+def _matches(word: str, keyword: str) -> bool:
+    # Short keywords ("apr") only match whole words, so "april" is not about debt.
+    return word == keyword or (len(keyword) >= 4 and word.startswith(keyword))
+
+
+def rank_queries(texts: Iterable[Tuple[str, float]], limit: int = MAX_QUERIES) -> List[str]:
+    """Stock queries for weighted texts, best first, always ending in the generic fallbacks."""
+    scores: Dict[str, float] = {}
+    for text, weight in texts:
+        words = _words(text)
+        found: Dict[str, float] = {}
+        for keyword, queries in VISUAL_QUERIES.items():
+            if not any(_matches(word, keyword) for word in words):
+                continue
+            for position, query in enumerate(queries):
+                # A keyword's first query is its best shot; later ones are alternates.
+                found[query] = max(found.get(query, 0.0), weight / (position + 1))
+        # Each text votes once per query, so a wordy field cannot outweigh the topic itself.
+        for query, score in found.items():
+            scores[query] = scores.get(query, 0.0) + score
+    # sorted() is stable, so ties keep the order the queries were first seen in.
+    ranked = sorted(scores, key=lambda query: -scores[query])[:limit]
+    return ranked + [query for query in GENERIC_QUERIES if query not in ranked]
+
+
+def topic_queries(entry: Dict[str, object]) -> List[str]:
+    texts = []
+    for field, weight in FIELD_WEIGHTS.items():
+        value = entry.get(field, "")
+        texts.append((" ".join(value) if isinstance(value, list) else str(value), weight))
+    return rank_queries(texts)
+
+
+class ClipIndex:
+    """Ranked stock-footage queries per topic (rebuilt per corpus version) and the cached clips behind them."""
+
+    def __init__(self, path: Path = CLIP_INDEX_PATH, corpus: Optional[TopicCorpus] = None) -> None:
+        self.path = path
+        self.corpus = corpus or get_corpus()
+        self.corpus_name = self.corpus.source.stem
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._sync(conn)
+            self._conn = conn
+        return self._conn
+
+    def _sync(self, conn: sqlite3.Connection) -> None:
+        """Rebuild this corpus's topic queries when the corpus or the query rules changed."""
+        key = f"stamp:{self.corpus_name}"
+        stamp = f"{self.corpus.stamp()}:{QUERY_VERSION}"
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        if row and row[0] == stamp:
+            return
+        entries = list(self.corpus.entries())
+        rows = [
+            (self.corpus_name, entry["topic"], rank, query)
+            for entry in entries
+            for rank, query in enumerate(topic_queries(entry))
+        ]
+        with conn:
+            conn.execute("DELETE FROM topic_queries WHERE corpus = ?", (self.corpus_name,))
+            conn.executemany("INSERT INTO topic_queries (corpus, topic, rank, query) VALUES (?, ?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, stamp))
+        print(f"Indexed clip queries for {len(entries)} topics from {self.corpus.source}")
+
+    def queries(self, topic: str) -> List[str]:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT query FROM topic_queries WHERE corpus = ? AND topic = ? ORDER BY rank",
+                (self.corpus_name, topic),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def clip_ids(self, query: str) -> Set[str]:
+        with self._lock:
+            rows = self._db().execute("SELECT clip_id FROM clip_queries WHERE query = ?", (query,)).fetchall()
+        return {row[0] for row in rows}
+
+    def pick(self, topic: str, max_uses: Optional[int] = CLIP_MAX_USES) -> Optional[Path]:
+        """Least-shown cached clip for ``topic`` under ``max_uses`` showings (None: any), counted as used."""
+        with self._lock:
+            conn = self._db()
+            rows = conn.execute(
+                """
+                SELECT c.clip_id, c.path, c.uses, MIN(q.rank) AS best
+                FROM topic_queries q
+                JOIN clip_queries cq ON cq.query = q.query
+                JOIN clips c ON c.clip_id = cq.clip_id
+                WHERE q.corpus = ? AND q.topic = ?
+                GROUP BY c.clip_id
+                ORDER BY c.uses, best
+                """,
+                (self.corpus_name, topic),
+            ).fetchall()
+            for clip_id, path, uses, _ in rows:
+                if max_uses is not None and uses >= max_uses:
+                    break
+                if not Path(path).exists():
+                    # Evicted from the clip cache; forget it so it stops winning lookups.
+                    with conn:
+                        conn.execute("DELETE FROM clip_queries WHERE clip_id = ?", (clip_id,))
+                        conn.execute("DELETE FROM clips WHERE clip_id = ?", (clip_id,))
+                    continue
+                self._use(conn, clip_id)
+                return Path(path)
+        return None
+
+    def add(self, clip: Path, query: str, used: bool = True) -> None:
+        """Register a cached clip as footage for ``query``."""
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            conn = self._db()
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO clips (clip_id, path, added) VALUES (?, ?, ?)", (clip.stem, str(clip), now)
+                )
+                conn.execute("INSERT OR IGNORE INTO clip_queries (query, clip_id) VALUES (?, ?)", (query, clip.stem))
+            if used:
+                self._use(conn, clip.stem)
+
+    @staticmethod
+    def _use(conn: sqlite3.Connection, clip_id: str) -> None:
+        with conn:
+            conn.execute(
+                "UPDATE clips SET uses = uses + 1, last_used = ? WHERE clip_id = ?",
+                (datetime.now(timezone.utc).isoformat(), clip_id),
+            )
+
+    def summary(self) -> List[Dict[str, object]]:
+        """Per topic: its queries and how many cached clips back them."""
+        with self._lock:
+            conn = self._db()
+            topics = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT DISTINCT topic FROM topic_queries WHERE corpus = ? ORDER BY topic", (self.corpus_name,)
+                )
+            ]
+        result = []
+        for topic in topics:
+            queries = self.queries(topic)
+            clips = set().union(*(self.clip_ids(query) for query in queries))
+            result.append({"topic": topic, "queries": queries, "clips": len(clips)})
+        return result
+
+
+_index: Optional[ClipIndex] = None
+
+
+def get_clip_index() -> ClipIndex:
+    global _index
+    if _index is None:
+        _index = ClipIndex()
+    return _index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show the topic-to-clip index for the current topic corpus")
+    parser.add_argument("--db", default=str(CLIP_INDEX_PATH))
+    args = parser.parse_args()
+
+    for row in ClipIndex(Path(args.db)).summary():
+        print(f"{row['topic']}: {row['clips']} cached clip(s); " + " | ".join(row["queries"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: budgets only, no cross-process queueing
+    fcntl = None  # type: ignore[assignment]
+
+from asset_manifest import CACHE_DIR
+
+SLOT_DIR = CACHE_DIR / "ffmpeg_slots"
+CALIBRATION_PATH = CACHE_DIR / "ffmpeg_calibration.json"
+GOVERNOR_ENABLED = os.getenv("FFMPEG_GOVERNOR", "1") == "1"
+# Overrides for the detected core count and for the threads one encode gets.
+FFMPEG_CORES = int(os.getenv("FFMPEG_CORES", "0") or 0)
+FFMPEG_THREADS = int(os.getenv("FFMPEG_THREADS", "0") or 0)
+# Working memory one busy ffmpeg thread needs (x264 lookahead, filter frames, decode buffers).
+MEM_PER_THREAD_MB = int(os.getenv("FFMPEG_MEM_PER_THREAD_MB", "300"))
+# A call that has queued this long runs with the cores that are free instead of waiting for all it asked for.
+SHRINK_AFTER_SEC = 2.0
+POLL_SEC = 0.05
+MAX_POLL_SEC = 0.5
+QUEUED_SEC = 0.05
+
+KINDS = ("encode", "decode", "light")
+
+
+@dataclass(frozen=True)
+class Host:
+    cores: int
+    mem_mb: int
+
+    def to_dict(self) -> Dict[str, int]:
+        return {"cores": self.cores, "mem_mb": self.mem_mb}
+
+
+def _read(path: str) -> str:
+    try:
+        return Path(path).read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+
+
+def detect_host() -> Host:
+    """Cores and memory this process may actually use, honouring CPU affinity and cgroup limits."""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    quota, _, period = _read("/sys/fs/cgroup/cpu.max").partition(" ")
+    if quota and quota != "max" and period:
+        cores = min(cores, max(1, int(int(quota) / int(period))))
+
+    mem_mb = 0
+    for line in _read("/proc/meminfo").splitlines():
+        if line.startswith("MemAvailable:"):
+            mem_mb = int(line.split()[1]) // 1024
+    limit = _read("/sys/fs/cgroup/memory.max")
+    if limit.isdigit():
+        mem_mb = min(mem_mb, int(limit) // (1024 * 1024)) if mem_mb else int(limit) // (1024 * 1024)
+    return Host(cores=FFMPEG_CORES or cores, mem_mb=mem_mb)
+
+
+def slot_count(host: Host) -> int:
+    """Threads the governor hands out at once: one per core, fewer if memory runs out first."""
+    slots = host.cores
+    if host.mem_mb and MEM_PER_THREAD_MB > 0:
+        slots = min(slots, host.mem_mb // MEM_PER_THREAD_MB)
+    return max(1, slots)
+
+
+def load_calibration(host: Host, path: Path = CALIBRATION_PATH) -> Dict[str, Any]:
+    """The bench_governor result for this host, or {} if it was measured on a different machine shape."""
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if data.get("host", {}).get("cores") == host.cores else {}
+
+
+def calibrated_jobs(default: int) -> int:
+    """Concurrent renders that gave the best videos/hour on this host, if it has been calibrated."""
+    return int(load_calibration(detect_host()).get("jobs") or default)
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Threads one ffmpeg invocation may use; its args go where ffmpeg expects each option."""
+
+    kind: str
+    threads: int
+    filter_threads: int
+
+    def global_args(self) -> List[str]:
+        """Right after ``ffmpeg``: threads for -vf/-af and -filter_complex graphs."""
+        return ["-filter_threads", str(self.filter_threads), "-filter_complex_threads", str(self.filter_threads)]
+
+    def codec_args(self, share: int = 1) -> List[str]:
+        """Before an input (decoder threads) or an output (encoder threads, split over ``share`` outputs)."""
+        return ["-threads", str(max(1, self.threads // max(1, share)))]
+
+
+@dataclass(frozen=True)
+class Call:
+    kind: str
+    label: str
+    threads: int
+    queued: float
+    started: float
+    finished: float
+
+    @property
+    def wait_sec(self) -> float:
+        return self.started - self.queued
+
+    @property
+    def run_sec(self) -> float:
+        return self.finished - self.started
+
+
+class FfmpegGovernor:
+    """Thread budgets and admission control for every ffmpeg call on the machine."""
+
+    # Each call holds one slot lock file per thread while it runs; the files live in cache/ so
+    # other worker processes (channel_runner) share the budget and queue instead of oversubscribing.
+
+    def __init__(
+        self,
+        host: Optional[Host] = None,
+        encode_threads: int = 0,
+        slot_dir: Path = SLOT_DIR,
+        enabled: bool = GOVERNOR_ENABLED,
+    ) -> None:
+        self.host = host or detect_host()
+        self.slots = slot_count(self.host)
+        threads = encode_threads or FFMPEG_THREADS or load_calibration(self.host).get("threads") or 0
+        # Uncalibrated, an encode takes every free slot, so a lone render keeps ffmpeg's full threading.
+        self.encode_adaptive = not threads
+        self.encode_threads = max(1, min(self.slots, int(threads or self.slots)))
+        self.slot_dir = slot_dir
+        self.enabled = enabled and fcntl is not None
+        self._calls: List[Call] = []
+        self._lock = threading.Lock()
+
+    def budget(self, kind: str) -> Budget:
+        if kind == "encode":
+            return Budget(kind, self.encode_threads, self.encode_threads)
+        if kind == "decode":
+            return Budget(kind, min(2, self.slots), 1)
+        if kind == "light":
+            return Budget(kind, 1, 1)
+        raise ValueError(f"Unknown ffmpeg workload '{kind}' (expected one of {', '.join(KINDS)})")
+
+    def _try_acquire(self, count: int) -> List[IO[str]]:
+        held: List[IO[str]] = []
+        # Start at a random slot so concurrent callers do not all contend for slot 0.
+        offset = random.randrange(self.slots)
+        for step in range(self.slots):
+            handle = (self.slot_dir / f"slot{(offset + step) % self.slots}.lock").open("a")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                continue
+            held.append(handle)
+            if len(held) == count:
+                break
+        return held
+
+    def _acquire(self, count: int, take_free: bool = False) -> List[IO[str]]:
+        self.slot_dir.mkdir(parents=True, exist_ok=True)
+        since = time.monotonic()
+        delay = POLL_SEC
+        while True:
+            held = self._try_acquire(count)
+            if len(held) == count or (held and (take_free or time.monotonic() - since >= SHRINK_AFTER_SEC)):
+                return held
+            # Never hold part of a budget while waiting; two half-served calls would deadlock.
+            for handle in held:
+                handle.close()
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_POLL_SEC)
+
+    @contextmanager
+    def slot(self, kind: str, label: str = "") -> Iterator[Budget]:
+        """Wait for free cores, then yield the budget to pass to ffmpeg; cores are released on exit."""
+        budget = self.budget(kind)
+        queued = time.monotonic()
+        take_free = kind == "encode" and self.encode_adaptive
+        held = self._acquire(budget.threads, take_free) if self.enabled else []
+        if held and len(held) < budget.threads:
+            budget = Budget(kind, len(held), min(budget.filter_threads, len(held)))
+        started = time.monotonic()
+        try:
+            yield budget
+        finally:
+            finished = time.monotonic()
+            for handle in held:
+                handle.close()
+            with self._lock:
+                self._calls.append(Call(kind, label, budget.threads, queued, started, finished))
+
+    def reset(self) -> None:
+        """Forget recorded calls, so the next report covers only the next job."""
+        with self._lock:
+            self._calls = []
+
+    def report(self) -> Dict[str, object]:
+        """Slot usage by this process's ffmpeg calls since it started."""
+        with self._lock:
+            calls = list(self._calls)
+        report: Dict[str, object] = {
+            "host": self.host.to_dict(),
+            "slots": self.slots,
+            "encode_threads": self.encode_threads,
+            "encode_adaptive": self.encode_adaptive,
+            "governed": self.enabled,
+            "calls": len(calls),
+        }
+        if hasattr(os, "getloadavg"):
+            report["load_1m"] = round(os.getloadavg()[0], 2)
+        if not calls:
+            return report
+
+        span = max(call.finished for call in calls) - min(call.queued for call in calls)
+        by_kind: Dict[str, Dict[str, float]] = {}
+        for call in calls:
+            stats = by_kind.setdefault(call.kind, {"calls": 0, "run_sec": 0.0, "wait_sec": 0.0, "thread_sec": 0.0})
+            stats["calls"] += 1
+            stats["run_sec"] += call.run_sec
+            stats["wait_sec"] += call.wait_sec
+            stats["thread_sec"] += call.threads * call.run_sec
+        thread_sec = sum(stats["thread_sec"] for stats in by_kind.values())
+        report.update(
+            {
+                "span_sec": round(span, 2),
+                # Share of the machine's slots this process kept busy while it had ffmpeg work.
+                "utilization": round(thread_sec / (self.slots * span), 3) if span > 0 else 0.0,
+                "queued_calls": sum(1 for call in calls if call.wait_sec > QUEUED_SEC),
+                "max_wait_sec": round(max(call.wait_sec for call in calls), 2),
+                "by_kind": {
+                    kind: {key: round(value, 2) for key, value in stats.items()} for kind, stats in by_kind.items()
+                },
+            }
+        )
+        return report
+
+
+_governor: Optional[FfmpegGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> FfmpegGovernor:
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = FfmpegGovernor()
+        return _governor
+
+
+def set_governor(governor: FfmpegGovernor) -> None:
+    """Replace the process-wide governor (bench_governor runs each split with its own budget)."""
+    global _governor
+    with _governor_lock:
+        _governor = governor
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show the ffmpeg thread budgets for this host")
+    parser.parse_args()
+
+    governor = get_governor()
+    print(f"Host: {governor.host.cores} core(s), {governor.host.mem_mb} MB available; {governor.slots} slot(s)")
+    calibration = load_calibration(governor.host)
+    if calibration:
+        print(f"Calibrated: {calibration['jobs']} job(s) x {calibration['threads']} thread(s)")
+    for kind in KINDS:
+        budget = governor.budget(kind)
+        print(f"{kind:<7} threads={budget.threads} filter_threads={budget.filter_threads}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,57 @@
 from __future__ import annotations
 
+import argparse
+import json
 import os
 import random
-import re
+import shutil
 import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
 import requests
 
-from content_factory import make_long, make_short
-from validation import validate_artifacts
+from asset_manifest import AssetManifest, file_digest, lesson_key, text_hash
+from audio_analysis import analyze, media_duration, pcm_output_args
+from backgrounds import (
+    GRADIENT_GRADE,
+    clip_cache_path,
+    clip_grade,
+    ensure_gradient_loop,
+    gradient_source,
+    ingest_clip,
+)
+from captions import TITLE_SHOW_SEC, OverlayTrack, build_overlay_track, overlay_graph, overlay_inputs
+from channels import current_channel
+from clip_index import FIELD_WEIGHTS, get_clip_index, rank_queries
+from content_factory import describe, make_long, make_short
+from ffmpeg_governor import get_governor
+from history_store import get_store
+from pipeline import Stage, run_stages
+from plan_gate import PlanGate
+from render_cache import RenderCache
+from render_profiles import BASE_HEIGHT, OUTPUT_VARIANTS, OutputVariant, RenderProfile, get_profile, get_variants
+from run_manifest import RunManifest
+from run_report import reset_run_report, update_run_report
+from script_model import Script
+from script_text import normalize_text
+from validation import attach_run_report, validate_artifacts
+from workspace import Workspace
 
 PEXELS_API_KEY = os.getenv("PEXELS_API_KEY", "").strip()
 
-OUT_DIR = Path("out")
-OUT_DIR.mkdir(exist_ok=True)
-
 MODE = os.getenv("VIDEO_MODE", "short")  # short | long
+SEGMENTED_RENDER = os.getenv("SEGMENTED_RENDER", "1") == "1"
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "0") or 0) or (os.cpu_count() or 2)
+SEGMENT_TAIL_SEC = 0.35
+PRERENDER_CAPTIONS = os.getenv("PRERENDER_CAPTIONS", "1") == "1"
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+
+ASSETS = AssetManifest()
+RENDER_CACHE = RenderCache()
 
 EDGE_VOICE_DEFAULT = os.getenv("EDGE_VOICE", "en-US-AriaNeural")
 EDGE_RATE = os.getenv("EDGE_RATE", "+4%")
@@ -42,23 +74,6 @@ def resolve_piper_bin() -> Path:
     return PIPER_BIN
 
 
-def ffprobe_duration(path: Path) -> float:
-    out = subprocess.check_output(
-        [
-            "ffprobe",
-            "-v",
-            "error",
-            "-show_entries",
-            "format=duration",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            str(path),
-        ],
-        text=True,
-    ).strip()
-    return float(out)
-
-
 def write_text_file(path: Path, text: str) -> None:
     safe = text.replace("\r\n", "\n").replace("\r", "\n").strip()
     path.write_text(safe, encoding="utf-8")
@@ -68,59 +83,25 @@ def ffmpeg_path(path: Path) -> str:
     return path.as_posix().replace(":", r"\:")
 
 
-def normalize_text(text: str) -> str:
-    replacements = {
-        "\u2019": "'",
-        "\u2018": "'",
-        "\u201c": '"',
-        "\u201d": '"',
-        "\u2014": "-",
-        "\u2013": "-",
-        "â€™": "'",
-        "â€œ": '"',
-        "â€\x9d": '"',
-        "â€“": "-",
-        "â€”": "-",
-        "Ã¢â‚¬â„¢": "'",
-        "Ã¢â‚¬Å“": '"',
-        "Ã¢â‚¬\x9d": '"',
-        "Ã¢â‚¬â€œ": "-",
-        "Ã¢â‚¬â€": "-",
-    }
-    normalized = text
-    for bad, good in replacements.items():
-        normalized = normalized.replace(bad, good)
-    normalized = re.sub(r"\s+", " ", normalized)
-    return normalized.strip()
-
-
-def script_to_tts_text(script: str) -> str:
-    lines = [ln.strip() for ln in script.splitlines() if ln.strip() and ln.strip() != "---"]
-    spoken: List[str] = []
-    for line in lines:
-        clean = re.sub(r"^Topic:\s*", "", line, flags=re.IGNORECASE)
-        clean = re.sub(r"^Lesson\s+\d+\s*$", "", clean, flags=re.IGNORECASE)
-        clean = clean.strip()
-        if not clean:
-            continue
-
-        if clean.endswith(":"):
-            clean = clean[:-1] + "."
-        if not re.search(r"[.!?]$", clean):
-            clean += "."
+def pick_edge_voice() -> str:
+    voices = list(current_channel().voices) or ["en-US-AriaNeural", "en-US-JennyNeural", "en-US-GuyNeural"]
+    day_seed = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    rng = random.Random(day_seed)
+    return os.getenv("EDGE_VOICE") or rng.choice(voices) or EDGE_VOICE_DEFAULT
 
-        spoken.append(clean)
 
-    text = "\n".join(spoken)
-    text = re.sub(r"\n{2,}", "\n", text)
-    return normalize_text(text)
+def voice_variants() -> List[str]:
+    """Extra voices (VOICE_VARIANTS, comma separated) rendered next to the day's voice."""
+    primary = pick_edge_voice()
+    voices: List[str] = []
+    for voice in (part.strip() for part in os.getenv("VOICE_VARIANTS", "").split(",")):
+        if voice and voice != primary and voice not in voices:
+            voices.append(voice)
+    return voices
 
 
-def make_audio_edge(mp3_path: Path, text: str) -> str:
-    voices = ["en-US-AriaNeural", "en-US-JennyNeural", "en-US-GuyNeural"]
-    day_seed = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    rng = random.Random(day_seed)
-    voice = os.getenv("EDGE_VOICE") or rng.choice(voices) or EDGE_VOICE_DEFAULT
+def make_audio_edge(mp3_path: Path, text: str, voice: str = "") -> str:
+    voice = voice or pick_edge_voice()
 
     cmd = [
         "python",
@@ -175,73 +156,161 @@ def make_audio_piper(wav_path: Path, text: str) -> None:
     print("Audio via Piper fallback")
 
 
-def make_audio(raw_path: Path, text: str) -> str:
+def make_audio(raw_path: Path, text: str, voice: str = "", fallback: bool = True) -> str:
     try:
-        make_audio_edge(raw_path, text)
+        make_audio_edge(raw_path, text, voice)
         return "edge"
     except Exception as exc:
+        if not fallback:
+            raise
         print(f"edge-tts failed, using Piper fallback: {exc}")
 
-    wav = OUT_DIR / "audio_raw.wav"
+    wav = raw_path.with_suffix(".wav")
     make_audio_piper(wav, text)
-    run(
-        [
-            "ffmpeg",
-            "-y",
-            "-i",
-            str(wav),
-            "-ar",
-            "44100",
-            "-ac",
-            "2",
-            "-b:a",
-            "192k",
-            str(raw_path),
-        ]
-    )
+    with get_governor().slot("light", raw_path.name) as budget:
+        run(
+            [
+                "ffmpeg",
+                "-y",
+                *budget.global_args(),
+                "-i",
+                str(wav),
+                "-ar",
+                "44100",
+                "-ac",
+                "2",
+                "-b:a",
+                "192k",
+                *budget.codec_args(),
+                str(raw_path),
+            ]
+        )
     return "piper"
 
 
-def post_process_audio(inp: Path, outp: Path) -> None:
-    run(
-        [
-            "ffmpeg",
-            "-y",
-            "-i",
-            str(inp),
-            "-af",
-            "highpass=f=65,lowpass=f=12500,"
-            "acompressor=threshold=-20dB:ratio=2.2:attack=8:release=140,"
-            "alimiter=limit=0.92",
+def synthesize_piece(raw_path: Path, text: str, asset_key: str = "", voice: str = "", fallback: bool = True) -> str:
+    voice = voice or pick_edge_voice()
+    if asset_key:
+        cached = ASSETS.find_audio(asset_key, voice)
+        if cached:
+            shutil.copyfile(cached, raw_path)
+            print(f"Reusing produced audio for {asset_key} ({voice})")
+            return "cache"
+
+    engine = make_audio(raw_path, text, voice, fallback)
+    # Only neural voices are worth reusing; a Piper fallback is regenerated next time.
+    if asset_key and engine == "edge":
+        ASSETS.store_audio(asset_key, voice, raw_path)
+    return engine
+
+
+def concat_audio(parts: List[Path], output: Path) -> None:
+    if len(parts) == 1:
+        shutil.copyfile(parts[0], output)
+        return
+
+    with get_governor().slot("light", output.name) as budget:
+        cmd = ["ffmpeg", "-y", *budget.global_args()]
+        for part in parts:
+            cmd += ["-i", str(part)]
+        inputs = "".join(f"[{idx}:a]" for idx in range(len(parts)))
+        cmd += [
+            "-filter_complex",
+            f"{inputs}concat=n={len(parts)}:v=0:a=1[a]",
+            "-map",
+            "[a]",
             "-ar",
             "44100",
             "-ac",
             "2",
             "-b:a",
             "192k",
-            str(outp),
+            *budget.codec_args(),
+            str(output),
         ]
-    )
+        run(cmd)
+
+
+def synthesize_parts(
+    raw_path: Path, pieces: List[Dict[str, object]], voice: str = "", fallback: bool = True
+) -> List[str]:
+    stem = raw_path.with_suffix("")
+    piece_paths: List[Path] = []
+    engines: List[str] = []
+    for idx, piece in enumerate(pieces):
+        piece_path = stem.with_name(f"{stem.name}_p{idx}.mp3")
+        engines.append(synthesize_piece(piece_path, piece["spoken"], piece["key"], voice, fallback))
+        piece_paths.append(piece_path)
+    concat_audio(piece_paths, raw_path)
+    return engines
+
+
+def tts_pieces(script: Script) -> List[Dict[str, object]]:
+    pieces: List[Dict[str, object]] = []
+    for unit in script.tts_units():
+        key = lesson_key(unit["topic"], unit["format"], unit["spoken"]) if unit["topic"] else ""
+        pieces.append({"id": unit["id"], "spoken": unit["spoken"], "sentences": unit["sentences"], "key": key})
+    return pieces
+
+
+def group_segments(pieces: List[Dict[str, object]]) -> List[List[Dict[str, object]]]:
+    segments: List[List[Dict[str, object]]] = []
+    for piece in pieces:
+        if piece["key"] or not segments:
+            segments.append([piece])
+        else:
+            segments[-1].append(piece)
+    return segments
+
+
+def post_process_audio(inp: Path, outp: Path) -> Dict[str, float]:
+    """Clean up TTS audio and return its analysis, taken from PCM written by the same ffmpeg run."""
+    pcm = outp.with_name(outp.name + ".pcm")
+    with get_governor().slot("light", outp.name) as budget:
+        run(
+            [
+                "ffmpeg",
+                "-y",
+                *budget.global_args(),
+                "-i",
+                str(inp),
+                "-filter_complex",
+                "[0:a]highpass=f=65,lowpass=f=12500,"
+                "acompressor=threshold=-20dB:ratio=2.2:attack=8:release=140,"
+                "alimiter=limit=0.92,asplit=2[out][pcm]",
+                "-map",
+                "[out]",
+                "-ar",
+                "44100",
+                "-ac",
+                "2",
+                "-b:a",
+                "192k",
+                *budget.codec_args(),
+                str(outp),
+                "-map",
+                "[pcm]",
+                *pcm_output_args(pcm),
+            ]
+        )
+    try:
+        return analyze(outp, pcm)
+    finally:
+        pcm.unlink(missing_ok=True)
 
 
-def split_caption_lines(text: str, max_words: int = 9) -> List[str]:
-    sentences = re.split(r"(?<=[.!?])\s+", text)
+def caption_lines(pieces: List[Dict[str, object]], max_words: int = 9) -> List[str]:
     lines: List[str] = []
-
-    for sentence in sentences:
-        words = sentence.strip().split()
-        if not words:
-            continue
-        while words:
-            chunk = words[:max_words]
-            words = words[max_words:]
-            lines.append(" ".join(chunk).strip())
-
+    for piece in pieces:
+        for sentence in piece["sentences"]:
+            words = sentence.split()
+            while words:
+                lines.append(" ".join(words[:max_words]))
+                words = words[max_words:]
     return lines
 
 
-def write_srt(srt_path: Path, spoken_text: str, total_sec: float) -> None:
-    lines = split_caption_lines(spoken_text)
+def write_srt(srt_path: Path, lines: List[str], total_sec: float) -> None:
     weights = [max(1, len(ln.split())) for ln in lines]
     total_weight = sum(weights) or 1
 
@@ -265,24 +334,12 @@ def write_srt(srt_path: Path, spoken_text: str, total_sec: float) -> None:
 
 
 def keywords_from_text(title: str, script: str) -> List[str]:
-    source = f"{title} {script}".lower()
-    choices = [
-        "stock market chart",
-        "financial planning",
-        "city business",
-        "calculator desk",
-        "person budgeting",
-        "money saving",
-        "investing concept",
-        "office laptop finance",
-    ]
-    selected = [item for item in choices if any(token in source for token in item.split()[:2])]
-    if not selected:
-        selected = ["financial planning", "money saving", "city business"]
-    return selected
+    """Stock queries for a script with no indexed topic; the title counts more than the body."""
+    return rank_queries([(title, FIELD_WEIGHTS["topic"]), (script, FIELD_WEIGHTS["quick_tip"])])
 
 
-def download_pexels_video(query: str, output_path: Path) -> Optional[Path]:
+def download_pexels_video(query: str, exclude: Set[str] = frozenset()) -> Optional[Path]:
+    """Best portrait match for ``query``, skipping videos already cached under ``exclude`` clip ids."""
     if not PEXELS_API_KEY:
         return None
 
@@ -309,11 +366,13 @@ def download_pexels_video(query: str, output_path: Path) -> Optional[Path]:
         return None
 
     best_url = None
+    best_id = ""
     best_score = -1
+    known_videos = {clip_id.rsplit("_", 1)[0] for clip_id in exclude}
 
     for video in videos:
         duration = int(video.get("duration", 0))
-        if duration < 5:
+        if duration < 5 or f"pexels_{video.get('id', '')}" in known_videos:
             continue
 
         for file_entry in video.get("video_files", []):
@@ -329,59 +388,145 @@ def download_pexels_video(query: str, output_path: Path) -> Optional[Path]:
             if score > best_score:
                 best_score = score
                 best_url = link
+                best_id = f"pexels_{video.get('id', '')}_{file_entry.get('id', '')}"
 
     if not best_url:
         return None
 
+    output_path = clip_cache_path(best_id)
+    if output_path.exists():
+        print(f"Clip cache hit: {output_path.name}")
+        return output_path
+
     try:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        # Workers for several channels may fetch the same clip at once.
+        partial = output_path.with_suffix(f".{os.getpid()}.part")
         with requests.get(best_url, stream=True, timeout=60) as download:
             download.raise_for_status()
-            with output_path.open("wb") as file:
+            with partial.open("wb") as file:
                 for chunk in download.iter_content(chunk_size=1024 * 256):
                     if chunk:
                         file.write(chunk)
+        partial.replace(output_path)
         return output_path
     except Exception as exc:
         print(f"Failed downloading Pexels video: {exc}")
         return None
 
 
+def subtitles_filter(srt_safe: str, caption_lift: int = 0) -> str:
+    # libass scales force_style sizes with the frame height, so the caption
+    # style is resolution independent. MarginV is in script units (288 high
+    # for SRT input), so a canvas-pixel lift is converted.
+    margin = 170 + round(caption_lift * 288 / BASE_HEIGHT)
+    return (
+        f"subtitles='{srt_safe}':"
+        "force_style='FontName=DejaVuSans,FontSize=50,PrimaryColour=&HFFFFFF&,"
+        f"OutlineColour=&H000000&,BorderStyle=1,Outline=3,Shadow=0,Alignment=2,MarginV={margin}'"
+    )
+
+
+def variant_scale(variant: OutputVariant, src: str, dst: str, profile: RenderProfile) -> str:
+    """Fit the vertical composite in ``src`` to the variant's frame, labelled ``dst``."""
+    w, h = variant.width, variant.height
+    if variant.landscape:
+        # The vertical frame centred over a blurred, cropped copy of itself.
+        return (
+            f"{src}split=2[{dst}fill][{dst}fg];"
+            f"[{dst}fill]scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h},boxblur=20:2[{dst}bg];"
+            f"[{dst}fg]scale=-2:{h}[{dst}fit];"
+            f"[{dst}bg][{dst}fit]overlay=x=(W-w)/2:y=0,format=yuv420p[{dst}]"
+        )
+    if (w, h) == (profile.width, profile.height):
+        return f"{src}format=yuv420p[{dst}]"
+    return f"{src}scale={w}:{h},format=yuv420p[{dst}]"
+
+
+def multi_output_graph(
+    shared: List[str],
+    variants: Sequence[OutputVariant],
+    profile: RenderProfile,
+    srt_safe: str,
+    include_subtitles: bool,
+    overlay_track: Optional[OverlayTrack],
+) -> str:
+    """Composite the shared layers once, then split into one captioned output [v<i>] per variant."""
+    # Captions go after the split so each variant keeps them inside its own platform's safe area.
+    count = len(variants)
+    splits = "".join(f"[s{i}]" for i in range(count))
+    chain = ",".join(shared) or "null"
+    parts: List[str] = []
+    if overlay_track is not None:
+        title_x, title_y = overlay_track.title_xy
+        parts.append(f"[0:v]{chain}[base]")
+        parts.append(
+            f"[base][2:v]overlay=x={title_x}:y={title_y}:enable='lt(t,{TITLE_SHOW_SEC})',split={count}{splits}"
+        )
+        parts.append(f"[3:v]split={count}" + "".join(f"[c{i}]" for i in range(count)))
+    else:
+        parts.append(f"[0:v]{chain},split={count}{splits}")
+
+    for i, variant in enumerate(variants):
+        if overlay_track is not None:
+            caption_y = overlay_track.caption_y - profile.px(variant.caption_lift)
+            parts.append(f"[s{i}][c{i}]overlay=x=0:y={caption_y}:eof_action=pass[t{i}]")
+        elif include_subtitles:
+            parts.append(f"[s{i}]{subtitles_filter(srt_safe, variant.caption_lift)}[t{i}]")
+        else:
+            parts.append(f"[s{i}]null[t{i}]")
+        parts.append(variant_scale(variant, f"[t{i}]", f"v{i}", profile))
+    return ";".join(parts)
+
+
 def build_visual_filter(
     title: str,
     srt_path: Path,
     use_background_video: bool,
     include_subtitles: bool = True,
+    profile: Optional[RenderProfile] = None,
+    title_file: Optional[Path] = None,
+    prepared_background: bool = False,
+    overlay_track: Optional[OverlayTrack] = None,
+    variants: Sequence[OutputVariant] = (),
 ) -> str:
-    title_file = OUT_DIR / "title.txt"
+    profile = profile or get_profile()
+    px = profile.px
+
+    title_file = title_file or srt_path.with_name("title.txt")
     write_text_file(title_file, normalize_text(title))
 
     title_path = ffmpeg_path(title_file)
     srt_safe = ffmpeg_path(srt_path)
 
+    # Prepared backgrounds are already canvas-sized and graded; only composite.
     base_filters: List[str] = []
-    if use_background_video:
-        base_filters.append("scale=1080:1920:force_original_aspect_ratio=increase")
-        base_filters.append("crop=1080:1920")
-        base_filters.append("eq=contrast=1.07:brightness=0.02:saturation=1.12")
+    if prepared_background:
+        base_filters = []
+    elif use_background_video:
+        base_filters.append(clip_grade(profile))
     else:
-        base_filters.append("noise=alls=8:allf=t+u")
-        base_filters.append("eq=contrast=1.05:brightness=0.08:saturation=1.20")
+        base_filters.append(GRADIENT_GRADE)
+
+    bottom_band = f"drawbox=x=0:y=ih-{px(350)}:w=iw:h={px(350)}:color=black@0.22:t=fill"
+    if overlay_track is not None and not variants:
+        # Inputs 0/1 are background/audio; the title card and caption track follow.
+        return overlay_graph(base_filters + [bottom_band], overlay_track, title_input=2, caption_input=3)
 
     overlays = [
-        "drawbox=x=60:y=130:w=960:h=230:color=black@0.35:t=fill",
+        f"drawbox=x={px(60)}:y={px(130)}:w={px(960)}:h={px(230)}:color=black@0.35:t=fill",
         "drawtext=fontfile=/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf:"
         f"textfile='{title_path}':reload=0:"
-        "fontcolor=white:fontsize=56:"
-        "x=(w-text_w)/2:y=185:enable='lt(t,3.8)'",
-        "drawbox=x=0:y=ih-350:w=iw:h=350:color=black@0.22:t=fill",
+        f"fontcolor=white:fontsize={px(56)}:"
+        f"x=(w-text_w)/2:y={px(185)}:enable='lt(t,3.8)'",
+        bottom_band,
     ]
+    if variants:
+        shared = base_filters + ([bottom_band] if overlay_track is not None else overlays)
+        return multi_output_graph(shared, variants, profile, srt_safe, include_subtitles, overlay_track)
 
     if include_subtitles:
-        overlays.append(
-            f"subtitles='{srt_safe}':"
-            "force_style='FontName=DejaVuSans,FontSize=50,PrimaryColour=&HFFFFFF&,"
-            "OutlineColour=&H000000&,BorderStyle=1,Outline=3,Shadow=0,Alignment=2,MarginV=170'"
-        )
+        overlays.append(subtitles_filter(srt_safe))
 
     overlays.append("format=yuv420p")
     return ",".join(base_filters + overlays)
@@ -393,74 +538,113 @@ def render_ffmpeg(
     vf: str,
     canvas_dur: float,
     background_video: Optional[Path],
+    profile: Optional[RenderProfile] = None,
+    overlay_track: Optional[OverlayTrack] = None,
 ) -> None:
+    profile = profile or get_profile()
     if background_video and background_video.exists():
+        video_input = ["-stream_loop", "-1", "-i", str(background_video)]
+    else:
+        video_input = ["-f", "lavfi", "-i", gradient_source(profile, canvas_dur)]
+
+    if overlay_track is not None:
+        filter_args = [*overlay_inputs(overlay_track), "-filter_complex", vf, "-map", "[v]"]
+    else:
+        filter_args = ["-vf", vf, "-map", "0:v:0"]
+
+    with get_governor().slot("encode", mp4.name) as budget:
         run(
             [
                 "ffmpeg",
                 "-y",
-                "-stream_loop",
-                "-1",
-                "-i",
-                str(background_video),
+                *budget.global_args(),
+                *budget.codec_args(),
+                *video_input,
                 "-i",
                 str(mp3),
-                "-t",
-                f"{canvas_dur:.2f}",
-                "-vf",
-                vf,
-                "-r",
-                "30",
-                "-map",
-                "0:v:0",
+                *filter_args,
                 "-map",
                 "1:a:0",
-                "-c:v",
-                "libx264",
-                "-preset",
-                "veryfast",
-                "-pix_fmt",
-                "yuv420p",
-                "-c:a",
-                "aac",
+                "-t",
+                f"{canvas_dur:.2f}",
+                *profile.video_args(),
+                *profile.audio_args(),
+                *budget.codec_args(),
                 str(mp4),
             ]
         )
-        return
 
-    run(
-        [
-            "ffmpeg",
-            "-y",
-            "-f",
-            "lavfi",
-            "-i",
-            (
-                "gradients=s=1080x1920:c0=0x0E2447:c1=0x2E63B0:"
-                "x0=0:y0=0:x1=1080:y1=1920:type=linear:speed=0.012:"
-                f"d={canvas_dur:.2f}:r=30"
-            ),
-            "-i",
-            str(mp3),
-            "-vf",
-            vf,
-            "-r",
-            "30",
-            "-map",
-            "0:v:0",
-            "-map",
-            "1:a:0",
-            "-c:v",
-            "libx264",
-            "-preset",
-            "veryfast",
-            "-pix_fmt",
-            "yuv420p",
-            "-c:a",
-            "aac",
-            str(mp4),
-        ]
-    )
+
+def variant_output_args(
+    index: int, variant: OutputVariant, path: Path, duration: float, audio_map: str
+) -> List[str]:
+    encoder = variant.encoder
+    return [
+        "-map",
+        f"[v{index}]",
+        "-map",
+        audio_map,
+        "-t",
+        f"{duration:.2f}",
+        *encoder.video_args(),
+        *encoder.audio_args(),
+        str(path),
+    ]
+
+
+def capped(canvas_dur: float, variant: OutputVariant, caps: Dict[str, float]) -> float:
+    cap = caps.get(variant.name, 0.0)
+    if cap and canvas_dur > cap:
+        print(f"Variant {variant.name}: cutting {canvas_dur:.2f}s to the {cap:.0f}s limit")
+        return cap
+    return canvas_dur
+
+
+def render_ffmpeg_variants(
+    mp3: Path,
+    outputs: Sequence[Tuple[OutputVariant, Path]],
+    graph: str,
+    canvas_dur: float,
+    background_video: Optional[Path],
+    profile: RenderProfile,
+    overlay_track: Optional[OverlayTrack] = None,
+    caps: Optional[Dict[str, float]] = None,
+) -> None:
+    """One decode and composite, one encode per output (graph from multi_output_graph)."""
+    if background_video and background_video.exists():
+        video_input = ["-stream_loop", "-1", "-i", str(background_video)]
+    else:
+        video_input = ["-f", "lavfi", "-i", gradient_source(profile, canvas_dur)]
+
+    with get_governor().slot("encode", outputs[0][1].name) as budget:
+        cmd = ["ffmpeg", "-y", *budget.global_args(), *budget.codec_args(), *video_input, "-i", str(mp3)]
+        if overlay_track is not None:
+            cmd += overlay_inputs(overlay_track)
+        cmd += ["-filter_complex", graph]
+        for index, (variant, path) in enumerate(outputs):
+            cmd += budget.codec_args(share=len(outputs))
+            cmd += variant_output_args(index, variant, path, capped(canvas_dur, variant, caps or {}), "1:a:0")
+        run(cmd)
+
+
+def derive_variants(
+    video: Path,
+    outputs: Sequence[Tuple[OutputVariant, Path]],
+    profile: RenderProfile,
+    caps: Optional[Dict[str, float]] = None,
+) -> None:
+    """Variants cut from an already finished video (captions stay where they were burned in)."""
+    duration = media_duration(video)
+    count = len(outputs)
+    parts = [f"[0:v]split={count}" + "".join(f"[s{i}]" for i in range(count))]
+    parts += [variant_scale(variant, f"[s{i}]", f"v{i}", profile) for i, (variant, _) in enumerate(outputs)]
+    with get_governor().slot("encode", outputs[0][1].name) as budget:
+        cmd = ["ffmpeg", "-y", *budget.global_args(), *budget.codec_args(), "-i", str(video)]
+        cmd += ["-filter_complex", ";".join(parts)]
+        for index, (variant, path) in enumerate(outputs):
+            cmd += budget.codec_args(share=len(outputs))
+            cmd += variant_output_args(index, variant, path, capped(duration, variant, caps or {}), "0:a:0")
+        run(cmd)
 
 
 def render_video(
@@ -470,86 +654,875 @@ def render_video(
     srt: Path,
     canvas_dur: float,
     background_video: Optional[Path],
+    profile: Optional[RenderProfile] = None,
+    title_file: Optional[Path] = None,
+    background_prepared: bool = False,
+    script: str = "",
+    variants: Sequence[Tuple[OutputVariant, Path]] = (),
+    caps: Optional[Dict[str, float]] = None,
+    card_dir: Optional[Path] = None,
 ) -> None:
-    attempts: List[Tuple[bool, bool]] = []
+    profile = profile or get_profile()
+    outputs = [(primary_variant(profile), mp4), *variants] if variants else []
     has_bg = bool(background_video and background_video.exists())
+    gradient_loop = ensure_gradient_loop(profile)
+    fallback = "loop" if gradient_loop else "live"
+
+    attempts: List[Tuple[str, bool]] = []
     if has_bg:
-        attempts.append((True, True))
-    attempts.append((False, True))
+        attempts.append(("clip", True))
+    attempts.append((fallback, True))
     if has_bg:
-        attempts.append((True, False))
-    attempts.append((False, False))
+        attempts.append(("clip", False))
+    attempts.append((fallback, False))
+    if gradient_loop:
+        attempts.append(("live", False))
+
+    # Caption/title rasterization failures surface here, before any encode starts.
+    overlay_track: Optional[OverlayTrack] = None
+    if PRERENDER_CAPTIONS:
+        try:
+            overlay_track = build_overlay_track(normalize_text(title), srt, card_dir or srt.parent / "cards", profile)
+            print(f"Caption compositor: {overlay_track.card_count} cards for {overlay_track.cue_count} cues")
+        except (subprocess.CalledProcessError, RuntimeError, OSError) as exc:
+            print(f"Caption compositor failed, using libass subtitles: {exc}")
 
-    last_error: Optional[subprocess.CalledProcessError] = None
+    sources = {"clip": background_video, "loop": gradient_loop, "live": None}
 
-    for use_bg, include_subtitles in attempts:
-        vf = build_visual_filter(
+    def graph_for(source: str, include_subtitles: bool) -> str:
+        return build_visual_filter(
             title=title,
             srt_path=srt,
-            use_background_video=use_bg,
+            use_background_video=source == "clip",
             include_subtitles=include_subtitles,
+            profile=profile,
+            title_file=title_file,
+            prepared_background=source == "loop" or (source == "clip" and background_prepared),
+            overlay_track=overlay_track if include_subtitles else None,
+            variants=[variant for variant, _ in outputs],
         )
+
+    def key_for(source: str, include_subtitles: bool) -> str:
+        return RENDER_CACHE.key(
+            script=script,
+            audio=mp3,
+            srt=srt,
+            title=title,
+            background=sources[source] or source,
+            filter_graph=graph_for(source, include_subtitles),
+            caption_style=subtitles_filter("", 0),
+            prerender_captions=PRERENDER_CAPTIONS,
+            profile=profile.to_dict(),
+            canvas_dur=round(canvas_dur, 3),
+            caps=caps or {},
+        )
+
+    def output_keys(render_key: str) -> List[Tuple[str, Path]]:
+        if not outputs:
+            return [(render_key, mp4)]
+        return [(RENDER_CACHE.key(render=render_key, variant=variant.to_dict()), path) for variant, path in outputs]
+
+    # Only the full-quality attempt is looked up; a fallback render is stored under its own key.
+    cache_key = key_for(*attempts[0])
+    cached = output_keys(cache_key)
+    missing = [(key, path) for key, path in cached if not RENDER_CACHE.contains(key)]
+    if not missing:
+        for key, path in cached:
+            RENDER_CACHE.get(key, path)
+        print(f"Render cache hit: {cache_key[:16]} ({len(cached)} output(s))")
+        return
+    RENDER_CACHE.miss(*missing[0])
+
+    last_error: Optional[subprocess.CalledProcessError] = None
+
+    for source, include_subtitles in attempts:
+        track = overlay_track if include_subtitles else None
+        vf = graph_for(source, include_subtitles)
         try:
-            print(f"Render attempt: background={use_bg}, subtitles={include_subtitles}")
-            render_ffmpeg(mp3, mp4, vf, canvas_dur, background_video if use_bg else None)
-            return
+            print(f"Render attempt: background={source}, subtitles={include_subtitles}")
+            if outputs:
+                render_ffmpeg_variants(mp3, outputs, vf, canvas_dur, sources[source], profile, track, caps)
+            else:
+                render_ffmpeg(mp3, mp4, vf, canvas_dur, sources[source], profile, track)
         except subprocess.CalledProcessError as exc:
             print(f"Render attempt failed: {exc}")
             last_error = exc
+            continue
+        for key, path in output_keys(key_for(source, include_subtitles)):
+            RENDER_CACHE.put(key, path)
+        return
 
     if last_error is not None:
         raise last_error
     raise RuntimeError("Render failed unexpectedly")
 
 
-def main() -> None:
-    if MODE == "long":
-        title, script, tags = make_long()
-    else:
-        title, script, tags = make_short()
+def primary_variant(profile: RenderProfile) -> OutputVariant:
+    """The main video.mp4 as one of the outputs of a multi-variant render."""
+    return OutputVariant(name="video", profile=profile.name, width=profile.width, height=profile.height)
+
+
+def variant_outputs(
+    mode: str, plan: Dict[str, object], workspace: Workspace
+) -> Tuple[List[Tuple[OutputVariant, Path]], Dict[str, float]]:
+    """VIDEO_VARIANTS for this mode with their files and duration caps from the plan's limits."""
+    limits = dict(plan.get("limits") or {})
+    variants = get_variants(mode)
+    outputs = [(variant, workspace.variant_video(variant.name)) for variant in variants]
+    caps = {variant.name: float(limits.get(variant.limit, 0)) for variant in variants if variant.limit}
+    return outputs, caps
+
+
+def pick_background(title: str, script: str, topics: Sequence[str] = ()) -> Optional[Path]:
+    index = get_clip_index()
+    for topic in topics:
+        clip = index.pick(topic)
+        if clip:
+            print(f"Using indexed clip for topic '{topic}': {clip.name}")
+            return clip
+    for topic in topics:
+        for query in index.queries(topic):
+            candidate = download_pexels_video(query, exclude=index.clip_ids(query))
+            if candidate:
+                index.add(candidate, query)
+                print(f"Using Pexels background for topic '{topic}', query: {query}")
+                return candidate
+    # Nothing new could be fetched: a much-shown relevant clip still beats an unrelated one.
+    for topic in topics:
+        clip = index.pick(topic, max_uses=None)
+        if clip:
+            print(f"Reusing indexed clip for topic '{topic}': {clip.name}")
+            return clip
+    for keyword in keywords_from_text(title, script):
+        candidate = download_pexels_video(keyword)
+        if candidate:
+            index.add(candidate, keyword)
+            print(f"Using Pexels background for query: {keyword}")
+            return candidate
+    return None
+
+
+def prepare_background(clip: Optional[Path], profile: RenderProfile) -> Tuple[Optional[Path], bool]:
+    if not clip:
+        return None, False
+    normalized = ingest_clip(clip, profile)
+    if normalized:
+        return normalized, True
+    return clip, False
+
+
+def pad_audio(inp: Path, outp: Path, total_sec: float) -> None:
+    with get_governor().slot("light", outp.name) as budget:
+        run(
+            [
+                "ffmpeg",
+                "-y",
+                *budget.global_args(),
+                "-i",
+                str(inp),
+                "-af",
+                f"apad=whole_dur={total_sec:.3f}",
+                "-t",
+                f"{total_sec:.3f}",
+                "-ar",
+                "44100",
+                "-ac",
+                "2",
+                "-b:a",
+                "192k",
+                *budget.codec_args(),
+                str(outp),
+            ]
+        )
+
+
+def concat_media(parts: List[Path], output: Path) -> None:
+    list_path = output.with_name(output.stem + "_concat.txt")
+    list_path.write_text(
+        "".join(f"file '{part.resolve().as_posix()}'\n" for part in parts),
+        encoding="utf-8",
+    )
+    with get_governor().slot("light", output.name):
+        run(["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(list_path), "-c", "copy", str(output)])
+
+
+def background_id(background_video: Optional[Path]) -> str:
+    if background_video and background_video.exists():
+        return file_digest(background_video)[:16]
+    return "gradient"
+
+
+def segment_tail(index: int, count: int) -> float:
+    return 0.8 if index == count - 1 else SEGMENT_TAIL_SEC
+
+
+def segment_audio(
+    index: int, pieces: List[Dict[str, object]], seg_dir: Path, tail_sec: float, voice: str = ""
+) -> Dict[str, object]:
+    # An explicitly requested voice has no Piper stand-in; only the day's voice falls back.
+    fallback = not voice
+    voice = voice or pick_edge_voice()
+    stem = seg_dir / f"seg_{index:02d}"
+    raw_mp3 = stem.with_name(stem.name + "_raw.mp3")
+    clean_mp3 = stem.with_name(stem.name + "_clean.mp3")
+    mp3 = stem.with_suffix(".mp3")
+    srt = stem.with_suffix(".srt")
+
+    engines = synthesize_parts(raw_mp3, pieces, voice, fallback)
+    speech_sec = post_process_audio(raw_mp3, clean_mp3)["duration_sec"]
+    if speech_sec <= 0:
+        raise RuntimeError(f"Segment {index} audio has invalid duration")
+
+    canvas_dur = speech_sec + tail_sec
+    pad_audio(clean_mp3, mp3, canvas_dur)
+    write_srt(srt, caption_lines(pieces), speech_sec)
+    return {"mp3": mp3.as_posix(), "srt": srt.as_posix(), "canvas_dur": canvas_dur, "piper": "piper" in engines}
+
+
+def synthesize_segments(
+    segments: List[List[Dict[str, object]]], seg_dir: Path, voice: str = ""
+) -> List[Dict[str, object]]:
+    seg_dir.mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(RENDER_WORKERS, len(segments)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(segment_audio, idx, pieces, seg_dir, segment_tail(idx, len(segments)), voice)
+            for idx, pieces in enumerate(segments)
+        ]
+        return [future.result() for future in futures]
+
+
+def render_segment(
+    index: int,
+    pieces: List[Dict[str, object]],
+    audio: Dict[str, object],
+    title: str,
+    seg_dir: Path,
+    background_video: Optional[Path],
+    profile: RenderProfile,
+    tail_sec: float,
+    bg_id: str,
+    background_prepared: bool = False,
+    voice: str = "",
+) -> Tuple[Path, Path]:
+    stem = seg_dir / f"seg_{index:02d}"
+    mp4 = stem.with_suffix(".mp4")
+    if not Path(str(audio["mp3"])).exists():
+        # Resumed run whose scratch audio is gone.
+        audio = segment_audio(index, pieces, seg_dir, tail_sec, voice)
+    mp3 = Path(str(audio["mp3"]))
+    canvas_dur = float(audio["canvas_dur"])
+
+    asset_key = next((piece["key"] for piece in pieces if piece["key"]), "")
+    render_key = text_hash(
+        json.dumps(
+            {
+                "pieces": pieces,
+                "voice": voice or pick_edge_voice(),
+                "title": title,
+                "profile": profile.to_dict(),
+                "tail": tail_sec,
+                "background": bg_id,
+            },
+            sort_keys=True,
+        )
+    )
+    cached = ASSETS.find_segment(asset_key, render_key) if asset_key else None
+    if cached:
+        shutil.copyfile(cached[0], mp3)
+        shutil.copyfile(cached[1], mp4)
+        print(f"Segment {index} reused from asset manifest")
+        return mp3, mp4
+
+    spoken = " ".join(str(piece["spoken"]) for piece in pieces)
+    render_video(
+        mp3,
+        mp4,
+        title,
+        Path(str(audio["srt"])),
+        canvas_dur,
+        background_video,
+        profile,
+        title_file=stem.with_name(stem.name + "_title.txt"),
+        background_prepared=background_prepared,
+        script=spoken,
+    )
+    if asset_key and not audio["piper"]:
+        ASSETS.store_segment(asset_key, render_key, mp3, mp4)
+    print(f"Segment {index} rendered ({canvas_dur:.2f}s)")
+    return mp3, mp4
+
+
+def render_segmented(
+    segments: List[List[Dict[str, object]]],
+    title: str,
+    mp3: Path,
+    mp4: Path,
+    background_video: Optional[Path],
+    profile: RenderProfile,
+    seg_dir: Path,
+    background_prepared: bool = False,
+    voice: str = "",
+    audio: Optional[List[Dict[str, object]]] = None,
+) -> Dict[str, int]:
+    if audio is None:
+        audio = synthesize_segments(segments, seg_dir, voice)
+    bg_id = background_id(background_video)
+
+    workers = max(1, min(RENDER_WORKERS, len(segments)))
+    print(f"Segmented render: {len(segments)} segments on {workers} workers")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                render_segment,
+                idx,
+                pieces,
+                audio[idx],
+                title if idx == 0 else f"Lesson {idx + 1}",
+                seg_dir,
+                background_video,
+                profile,
+                segment_tail(idx, len(segments)),
+                bg_id,
+                background_prepared,
+                voice,
+            )
+            for idx, pieces in enumerate(segments)
+        ]
+        results = [future.result() for future in futures]
+
+    concat_media([seg_mp3 for seg_mp3, _ in results], mp3)
+    concat_media([seg_mp4 for _, seg_mp4 in results], mp4)
+    return {"segments": len(segments), "render_workers": workers}
+
+
+def stage_compose(mode: str, workspace: Workspace) -> Dict[str, object]:
+    gate = PlanGate(pick_edge_voice(), EDGE_RATE)
+    composed = make_long(gate) if mode == "long" else make_short(gate)
+    print(f"Plan: ~{gate.plan['predicted_sec']:.1f}s of audio, limits {gate.plan['limits'] or 'none'}")
+
+    pieces = tts_pieces(composed)
+    script = normalize_text(composed.text)
+    title = normalize_text(composed.title)
+    spoken_text = composed.spoken_text
+
+    write_text_file(workspace.script, script)
+    write_text_file(workspace.spoken_script, spoken_text)
+    return {
+        "title": title,
+        "script": script,
+        "tags": composed.tags,
+        "pieces": pieces,
+        "spoken_text": spoken_text,
+        "plan": gate.plan,
+        "topics": list(dict.fromkeys(segment.topic for segment in composed.segments if segment.topic)),
+    }
 
-    script = normalize_text(script)
-    title = normalize_text(title)
-    spoken_text = script_to_tts_text(script)
 
-    raw_mp3 = OUT_DIR / "audio_raw.mp3"
-    mp3 = OUT_DIR / "audio.mp3"
-    mp4 = OUT_DIR / "video.mp4"
-    srt = OUT_DIR / "captions.srt"
-    bg_video = OUT_DIR / "background.mp4"
+def stage_background(title: str, script: str, topics: List[str], profile: RenderProfile) -> Dict[str, object]:
+    background, prepared = prepare_background(pick_background(title, script, topics), profile)
+    return {"background": background, "background_prepared": prepared}
 
-    write_text_file(OUT_DIR / "script.txt", script)
-    write_text_file(OUT_DIR / "spoken_script.txt", spoken_text)
 
-    tts_engine = make_audio(raw_mp3, spoken_text)
-    print(f"TTS engine: {tts_engine}")
+def stage_fallback_background(profile: RenderProfile) -> Dict[str, object]:
+    return {"gradient_loop": ensure_gradient_loop(profile)}
 
-    post_process_audio(raw_mp3, mp3)
-    audio_sec = ffprobe_duration(mp3)
+
+def stage_tts(pieces: List[Dict[str, object]], workspace: Workspace) -> Dict[str, object]:
+    raw_mp3 = workspace.work("audio_raw.mp3")
+    tts_engines = synthesize_parts(raw_mp3, pieces)
+    print(f"TTS engines: {', '.join(tts_engines)}")
+    return {"raw_audio": raw_mp3, "tts_engines": tts_engines}
+
+
+def stage_audio(raw_audio: Path, workspace: Workspace) -> Dict[str, object]:
+    mp3 = workspace.audio
+    analysis = post_process_audio(raw_audio, mp3)
+    audio_sec = analysis["duration_sec"]
     if audio_sec <= 0:
         raise RuntimeError("Generated audio has invalid duration")
+    update_run_report(workspace.run_report, audio_analysis=analysis)
+    return {"audio": mp3, "audio_sec": audio_sec}
 
-    write_srt(srt, spoken_text, audio_sec)
 
-    picked_bg = None
-    for keyword in keywords_from_text(title, script):
-        candidate = download_pexels_video(keyword, bg_video)
-        if candidate:
-            picked_bg = candidate
-            print(f"Using Pexels background for query: {keyword}")
-            break
+def stage_captions(pieces: List[Dict[str, object]], audio_sec: float, workspace: Workspace) -> Dict[str, object]:
+    srt = workspace.work("captions.srt")
+    write_srt(srt, caption_lines(pieces), audio_sec)
+    return {"captions": srt}
 
-    canvas_dur = audio_sec + 0.8
-    render_video(mp3, mp4, title, srt, canvas_dur, picked_bg)
 
-    Path("meta_title.txt").write_text(title, encoding="utf-8")
-    Path("meta_desc.txt").write_text(
-        f"Silent Money Blueprint.\n\n{tags}",
-        encoding="utf-8",
+def stage_render(
+    audio: Path,
+    audio_sec: float,
+    captions: Path,
+    title: str,
+    script: str,
+    background: Optional[Path],
+    background_prepared: bool,
+    plan: Dict[str, object],
+    mode: str,
+    profile: RenderProfile,
+    workspace: Workspace,
+) -> Dict[str, object]:
+    mp4 = workspace.video
+    outputs, caps = variant_outputs(mode, plan, workspace)
+    render_video(
+        audio,
+        mp4,
+        title,
+        captions,
+        audio_sec + 0.8,
+        background,
+        profile,
+        background_prepared=background_prepared,
+        script=script,
+        variants=outputs,
+        caps=caps,
+        card_dir=workspace.work("cards"),
     )
+    return {"video": mp4, "variants": report_variants(outputs, caps, workspace)}
+
+
+def stage_segment_tts(pieces: List[Dict[str, object]], workspace: Workspace) -> Dict[str, object]:
+    return {"segment_audio": synthesize_segments(group_segments(pieces), workspace.work("segments"))}
+
+
+def stage_segments(
+    pieces: List[Dict[str, object]],
+    segment_audio: List[Dict[str, object]],
+    title: str,
+    background: Optional[Path],
+    background_prepared: bool,
+    plan: Dict[str, object],
+    mode: str,
+    profile: RenderProfile,
+    workspace: Workspace,
+) -> Dict[str, object]:
+    mp3 = workspace.audio
+    mp4 = workspace.video
+    summary = render_segmented(
+        group_segments(pieces),
+        title,
+        mp3,
+        mp4,
+        background,
+        profile,
+        workspace.work("segments"),
+        background_prepared,
+        audio=segment_audio,
+    )
+    update_run_report(workspace.run_report, **summary)
+    # Segments are concatenated by stream copy, so variants are cut from the result in one extra pass.
+    outputs, caps = variant_outputs(mode, plan, workspace)
+    if outputs:
+        derive_variants(mp4, outputs, profile, caps)
+    return {"audio": mp3, "video": mp4, "variants": report_variants(outputs, caps, workspace)}
+
+
+def report_variants(
+    outputs: Sequence[Tuple[OutputVariant, Path]], caps: Dict[str, float], workspace: Workspace
+) -> List[str]:
+    if outputs:
+        update_run_report(
+            workspace.run_report,
+            variants={
+                variant.name: {**variant.to_dict(), "path": path.as_posix(), "max_sec": caps.get(variant.name, 0.0)}
+                for variant, path in outputs
+            },
+        )
+        print(f"Variants: {', '.join(variant.name for variant, _ in outputs)}")
+    return [variant.name for variant, _ in outputs]
+
+
+def voice_audio(voice: str, pieces: List[Dict[str, object]], workspace: Workspace) -> Tuple[float, Path]:
+    raw_mp3 = workspace.work("audio_raw.mp3")
+    synthesize_parts(raw_mp3, pieces, voice, fallback=False)
+    audio_sec = post_process_audio(raw_mp3, workspace.audio)["duration_sec"]
+    if audio_sec <= 0:
+        raise RuntimeError(f"Audio for {voice} has invalid duration")
+    srt = workspace.work("captions.srt")
+    write_srt(srt, caption_lines(pieces), audio_sec)
+    return audio_sec, srt
+
+
+def render_voice(
+    voice: str,
+    pieces: List[Dict[str, object]],
+    title: str,
+    script: str,
+    background: Optional[Path],
+    background_prepared: bool,
+    plan: Dict[str, object],
+    mode: str,
+    profile: RenderProfile,
+    workspace: Workspace,
+    card_dir: Path,
+    audio: Optional[Tuple[float, Path]] = None,
+) -> None:
+    outputs, caps = variant_outputs(mode, plan, workspace)
+    if audio is None:
+        render_segmented(
+            group_segments(pieces),
+            title,
+            workspace.audio,
+            workspace.video,
+            background,
+            profile,
+            workspace.work("segments"),
+            background_prepared,
+            voice,
+        )
+        if outputs:
+            derive_variants(workspace.video, outputs, profile, caps)
+    else:
+        audio_sec, srt = audio
+        render_video(
+            workspace.audio,
+            workspace.video,
+            title,
+            srt,
+            audio_sec + 0.8,
+            background,
+            profile,
+            background_prepared=background_prepared,
+            script=script,
+            variants=outputs,
+            caps=caps,
+            card_dir=card_dir,
+        )
+    report_variants(outputs, caps, workspace)
+
+
+def stage_voices(
+    pieces: List[Dict[str, object]],
+    title: str,
+    script: str,
+    spoken_text: str,
+    background: Optional[Path],
+    background_prepared: bool,
+    plan: Dict[str, object],
+    mode: str,
+    profile: RenderProfile,
+    workspace: Workspace,
+) -> Dict[str, object]:
+    """Render VOICE_VARIANTS into voices/<voice>/, reusing the day's background and cards; failed voices are skipped."""
+    voices = voice_variants()
+    if not voices:
+        return {"voice_variants": []}
+    segmented = mode == "long" and SEGMENTED_RENDER
+    spaces = {voice: workspace.for_voice(voice) for voice in voices}
+    for voice, space in spaces.items():
+        reset_run_report(space.run_report)
+        update_run_report(
+            space.run_report, mode=mode, job_id=workspace.job_id, voice=voice, render_profile=profile.to_dict()
+        )
+        write_text_file(space.script, script)
+        write_text_file(space.spoken_script, spoken_text)
+
+    audio: Dict[str, Optional[Tuple[float, Path]]] = {voice: None for voice in voices}
+    failed: Dict[str, str] = {}
+    if not segmented:
+        with ThreadPoolExecutor(max_workers=len(voices)) as pool:
+            futures = {voice: pool.submit(voice_audio, voice, pieces, spaces[voice]) for voice in voices}
+            for voice, future in futures.items():
+                try:
+                    audio[voice] = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    failed[voice] = str(exc)
+
+    card_dir = workspace.work("cards")
+    rendered: List[str] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(RENDER_WORKERS, len(voices)))) as pool:
+        futures = {
+            voice: pool.submit(
+                render_voice,
+                voice,
+                pieces,
+                title,
+                script,
+                background,
+                background_prepared,
+                plan,
+                mode,
+                profile,
+                spaces[voice],
+                card_dir,
+                audio[voice],
+            )
+            for voice in voices
+            if voice not in failed
+        }
+        for voice, future in futures.items():
+            try:
+                future.result()
+                validation = validate_artifacts(strict=True, workspace=spaces[voice])
+                record_render(mode, profile, spaces[voice], voice, validation["metrics"], plan, fanout=True)
+                rendered.append(voice)
+            except Exception as exc:  # noqa: BLE001
+                failed[voice] = str(exc)
+
+    for voice, error in failed.items():
+        print(f"Voice variant {voice} failed: {error}")
+    update_run_report(workspace.run_report, voice_variants={"rendered": rendered, "failed": failed})
+    print(f"Voice variants: {', '.join(rendered) or 'none'} rendered")
+    return {"voice_variants": rendered}
+
+
+def stage_metadata(title: str, tags: str, workspace: Workspace) -> Dict[str, object]:
+    workspace.meta_title.write_text(title, encoding="utf-8")
+    workspace.meta_desc.write_text(describe(tags), encoding="utf-8")
+    return {"meta_title": workspace.meta_title, "meta_desc": workspace.meta_desc}
+
+
+def stage_validate(
+    video: Path,
+    audio: Path,
+    meta_title: Path,
+    meta_desc: Path,
+    workspace: Workspace,
+) -> Dict[str, object]:
+    return {"validation": validate_artifacts(strict=True, workspace=workspace)}
+
+
+def build_stages(mode: str) -> List[Stage]:
+    stages = [
+        Stage(
+            "compose",
+            stage_compose,
+            ("mode", "workspace"),
+            ("title", "script", "tags", "pieces", "spoken_text", "plan", "topics"),
+        ),
+        Stage(
+            "background",
+            stage_background,
+            ("title", "script", "topics", "profile"),
+            ("background", "background_prepared"),
+        ),
+        Stage("fallback_background", stage_fallback_background, ("profile",), ("gradient_loop",)),
+        Stage("metadata", stage_metadata, ("title", "tags", "workspace"), ("meta_title", "meta_desc")),
+    ]
+    if mode == "long" and SEGMENTED_RENDER:
+        stages.append(Stage("segment_tts", stage_segment_tts, ("pieces", "workspace"), ("segment_audio",)))
+        stages.append(
+            Stage(
+                "segments",
+                stage_segments,
+                (
+                    "pieces",
+                    "segment_audio",
+                    "title",
+                    "background",
+                    "background_prepared",
+                    "plan",
+                    "mode",
+                    "profile",
+                    "workspace",
+                ),
+                ("audio", "video", "variants"),
+                after=("fallback_background",),
+            )
+        )
+    else:
+        stages += [
+            Stage("tts", stage_tts, ("pieces", "workspace"), ("raw_audio", "tts_engines")),
+            Stage("audio", stage_audio, ("raw_audio", "workspace"), ("audio", "audio_sec")),
+            Stage("captions", stage_captions, ("pieces", "audio_sec", "workspace"), ("captions",)),
+            Stage(
+                "render",
+                stage_render,
+                (
+                    "audio",
+                    "audio_sec",
+                    "captions",
+                    "title",
+                    "script",
+                    "background",
+                    "background_prepared",
+                    "plan",
+                    "mode",
+                    "profile",
+                    "workspace",
+                ),
+                ("video", "variants"),
+                after=("fallback_background",),
+            ),
+        ]
+    stages.append(
+        Stage(
+            "voices",
+            stage_voices,
+            (
+                "pieces",
+                "title",
+                "script",
+                "spoken_text",
+                "background",
+                "background_prepared",
+                "plan",
+                "mode",
+                "profile",
+                "workspace",
+            ),
+            ("voice_variants",),
+            after=("fallback_background",),
+        )
+    )
+    stages.append(
+        Stage(
+            "validate",
+            stage_validate,
+            ("video", "audio", "meta_title", "meta_desc", "workspace"),
+            ("validation",),
+        )
+    )
+    return stages
+
+
+def spoken_voice(context: Dict[str, object]) -> str:
+    """The voice that actually spoke: the day's edge-tts voice, or "piper" if any piece fell back to it."""
+    engines = list(context.get("tts_engines") or [])
+    engines += ["piper" for audio in context.get("segment_audio") or [] if audio["piper"]]
+    return "piper" if "piper" in engines else pick_edge_voice()
+
+
+def record_render(
+    mode: str,
+    profile: RenderProfile,
+    workspace: Workspace,
+    voice: str,
+    validation_metrics: Dict[str, object],
+    plan: Dict[str, object],
+    wall_sec: float = 0.0,
+    **details: object,
+) -> None:
+    get_store().record_render(
+        mode,
+        profile.name,
+        workspace.job_id,
+        voice=voice,
+        word_count=validation_metrics["script_word_count"],
+        audio_sec=validation_metrics["audio_seconds"],
+        video_sec=validation_metrics["video_seconds"],
+        size_bytes=workspace.video.stat().st_size,
+        wall_sec=wall_sec,
+        details={
+            **details,
+            "predicted_sec": plan.get("raw_sec") or plan["predicted_sec"],
+            "tts_engine": "piper" if voice == "piper" else "edge",
+            "edge_rate": EDGE_RATE,
+        },
+    )
+
+
+def run_job(workspace: Workspace, mode: str = MODE, resume: bool = False) -> Dict[str, object]:
+    profile = get_profile()
+    # The producer runs many jobs in one process; each run report covers only its own job.
+    RENDER_CACHE.reset()
+    get_governor().reset()
+    print(f"Render profile: {profile.name} ({profile.width}x{profile.height}@{profile.fps})")
+
+    # A variant left over from an earlier run must not be uploaded as this one's.
+    current = {variant.name for variant in get_variants(mode)}
+    for name in OUTPUT_VARIANTS:
+        if name not in current:
+            workspace.variant_video(name).unlink(missing_ok=True)
+
+    stages = build_stages(mode)
+    context: Dict[str, object] = {"mode": mode, "profile": profile, "workspace": workspace}
+    run_key = {
+        "mode": mode,
+        "profile": profile.name,
+        "segmented": mode == "long" and SEGMENTED_RENDER,
+        "day": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+        "run_id": os.getenv("GITHUB_RUN_ID", ""),
+        "job_id": workspace.job_id,
+        "variants": sorted(current),
+        "voices": voice_variants(),
+    }
+
+    manifest = RunManifest(workspace.run_manifest)
+    skip: Set[str] = set()
+    if resume and manifest.load() and manifest.matches(run_key):
+        skip, restored = manifest.resumable(stages, set(context))
+        context.update(restored)
+        print(f"Resuming run; completed stages: {', '.join(sorted(skip)) or 'none'}")
+    else:
+        if resume:
+            print("No matching checkpoint found; starting a fresh run")
+        manifest.start(run_key)
+        # Only a fresh run starts a fresh report; a resumed one keeps what its completed stages wrote.
+        reset_run_report(workspace.run_report)
+    update_run_report(
+        workspace.run_report,
+        mode=mode,
+        job_id=workspace.job_id,
+        workspace={"root": workspace.root.as_posix(), "scratch": workspace.scratch.as_posix()},
+        render_profile=profile.to_dict(),
+    )
+
+    context, metrics = run_stages(
+        stages,
+        context,
+        max_workers=PIPELINE_WORKERS,
+        skip=skip,
+        on_complete=manifest.record,
+    )
+
+    run_info = update_run_report(
+        workspace.run_report,
+        render_cache=RENDER_CACHE.report(),
+        pipeline=metrics,
+        ffmpeg=get_governor().report(),
+    )
+    cache_report = run_info["render_cache"]
+    print(f"Render cache: {cache_report['hits']} hit(s), {cache_report['misses']} miss(es)")
+    ffmpeg_report = run_info["ffmpeg"]
+    if ffmpeg_report["calls"]:
+        print(
+            f"ffmpeg: {ffmpeg_report['calls']} call(s) on {ffmpeg_report['slots']} slot(s), "
+            f"{ffmpeg_report['utilization']:.0%} utilized, {ffmpeg_report['queued_calls']} queued "
+            f"(max wait {ffmpeg_report['max_wait_sec']}s)"
+        )
+    print(
+        f"Pipeline: {metrics['wall_sec']:.1f}s wall, {metrics['serial_sec']:.1f}s serial, "
+        f"critical path {' -> '.join(metrics['critical_path'])} ({metrics['critical_path_sec']:.1f}s)"
+    )
+
+    attach_run_report(workspace)
+
+    record_render(
+        mode,
+        profile,
+        workspace,
+        spoken_voice(context),
+        context["validation"]["metrics"],
+        context["plan"],
+        wall_sec=metrics["wall_sec"],
+        render_cache=cache_report,
+        critical_path=metrics["critical_path"],
+    )
+    return context
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the last run from its first incomplete stage",
+    )
+    parser.add_argument("--job", default=None, help="Job id; artifacts go to jobs/<id>/ instead of out/")
+    parser.add_argument("--scratch", default=None, help="Scratch base directory for intermediates, or 'tmpfs'")
+    args = parser.parse_args()
+
+    if args.scratch is not None:
+        os.environ["SMBB_SCRATCH_DIR"] = args.scratch
+    workspace = Workspace.from_env(args.job)
 
-    report = validate_artifacts(strict=True)
-    print("Validation ok:", report["metrics"])
+    context = run_job(workspace, MODE, resume=args.resume)
+    workspace.cleanup_scratch()
+    print("Validation ok:", context["validation"]["metrics"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,413 @@
+from __future__ import annotations
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+HISTORY_DB_PATH = Path(os.getenv("SMBB_HISTORY_DB", "out/history.sqlite3"))
+LEGACY_HISTORY_PATH = Path("out/content_history.json")
+# Full script text is only kept this long; the hash stays, so exact de-dup still covers all history.
+SCRIPT_TEXT_DAYS = float(os.getenv("HISTORY_SCRIPT_TEXT_DAYS", "90"))
+EXPORT_RENDERS = 200
+
+# Columns of the compact export: everything de-dup, calibration and upload checks read, no script text.
+EXPORT_COLUMNS = {
+    "picks": "created, mode, topic, format, hook, job_id",
+    "scripts": "created, mode, script_hash, title, job_id",
+    "fingerprints": "created, job_id, simhash, band0, band1, band2, band3",
+    "renders": (
+        "created, job_id, mode, profile, voice, word_count, audio_sec, video_sec, size_bytes, wall_sec, details"
+    ),
+    "uploads": "created, job_id, platform, remote_id, status, details",
+    "meta": "key, value",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS picks (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    mode TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    format TEXT NOT NULL,
+    hook TEXT NOT NULL DEFAULT '',
+    job_id TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS picks_created ON picks (created);
+CREATE INDEX IF NOT EXISTS picks_topic ON picks (topic, created);
+CREATE INDEX IF NOT EXISTS picks_format ON picks (format, created);
+
+CREATE TABLE IF NOT EXISTS scripts (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    mode TEXT NOT NULL,
+    script_hash TEXT NOT NULL,
+    title TEXT NOT NULL,
+    script TEXT NOT NULL,
+    job_id TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS scripts_created ON scripts (created);
+CREATE INDEX IF NOT EXISTS scripts_hash ON scripts (script_hash);
+
+CREATE TABLE IF NOT EXISTS renders (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    job_id TEXT NOT NULL DEFAULT '',
+    mode TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    voice TEXT NOT NULL DEFAULT '',
+    word_count INTEGER NOT NULL DEFAULT 0,
+    audio_sec REAL NOT NULL DEFAULT 0,
+    video_sec REAL NOT NULL DEFAULT 0,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    wall_sec REAL NOT NULL DEFAULT 0,
+    details TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS renders_created ON renders (created);
+
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    job_id TEXT NOT NULL DEFAULT '',
+    platform TEXT NOT NULL,
+    remote_id TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '',
+    details TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS uploads_created ON uploads (created);
+CREATE INDEX IF NOT EXISTS uploads_platform ON uploads (platform, created);
+
+CREATE TABLE IF NOT EXISTS fingerprints (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    job_id TEXT NOT NULL DEFAULT '',
+    simhash INTEGER NOT NULL,
+    band0 INTEGER NOT NULL,
+    band1 INTEGER NOT NULL,
+    band2 INTEGER NOT NULL,
+    band3 INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fingerprints_band0 ON fingerprints (band0);
+CREATE INDEX IF NOT EXISTS fingerprints_band1 ON fingerprints (band1);
+CREATE INDEX IF NOT EXISTS fingerprints_band2 ON fingerprints (band2);
+CREATE INDEX IF NOT EXISTS fingerprints_band3 ON fingerprints (band3);
+
+-- Scheduler state derived from picks; rebuilt from them when missing or when the corpus changes.
+CREATE TABLE IF NOT EXISTS rotation (
+    topic TEXT NOT NULL,
+    format TEXT NOT NULL,
+    weight REAL NOT NULL,
+    used REAL NOT NULL DEFAULT 0,
+    due REAL NOT NULL,
+    jitter REAL NOT NULL,
+    PRIMARY KEY (topic, format)
+);
+CREATE INDEX IF NOT EXISTS rotation_due ON rotation (due, jitter);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def script_hash(script: str) -> str:
+    return hashlib.sha256(" ".join(script.split()).encode("utf-8")).hexdigest()
+
+
+def _signed64(value: int) -> int:
+    # SQLite integers are signed 64-bit.
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class HistoryStore:
+    """Append-only ledger of picks, scripts, renders and uploads."""
+
+    def __init__(self, path: Path = HISTORY_DB_PATH) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        # WAL lets readers (other jobs, reporting) proceed while one writer appends.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.close()
+
+    def _insert(self, table: str, row: Dict[str, Any]) -> int:
+        row = {"created": time.time(), **row}
+        columns = ", ".join(row)
+        marks = ", ".join("?" for _ in row)
+        with self._lock:
+            cursor = self._conn.execute(f"INSERT INTO {table} ({columns}) VALUES ({marks})", tuple(row.values()))
+            self._conn.commit()
+            return int(cursor.lastrowid)
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return list(self._conn.execute(sql, tuple(params)))
+
+    def record_pick(self, mode: str, topic: str, format_name: str, hook: str = "", job_id: str = "") -> int:
+        return self._insert(
+            "picks",
+            {"mode": mode, "topic": topic, "format": format_name, "hook": hook, "job_id": job_id},
+        )
+
+    def record_script(self, mode: str, title: str, script: str, job_id: str = "") -> int:
+        return self._insert(
+            "scripts",
+            {"mode": mode, "script_hash": script_hash(script), "title": title, "script": script, "job_id": job_id},
+        )
+
+    def record_render(self, mode: str, profile: str, job_id: str = "", **fields: Any) -> int:
+        """One row per job and voice: a resumed job that records again replaces its earlier row."""
+        details = fields.pop("details", {})
+        if job_id:
+            with self._lock:
+                # Left uncommitted, so the delete and the insert below land in one transaction.
+                self._conn.execute(
+                    "DELETE FROM renders WHERE job_id = ? AND voice = ?", (job_id, fields.get("voice", ""))
+                )
+        return self._insert(
+            "renders",
+            {"mode": mode, "profile": profile, "job_id": job_id, "details": json.dumps(details), **fields},
+        )
+
+    def record_upload(self, platform: str, remote_id: str, status: str = "", job_id: str = "", **details: Any) -> int:
+        return self._insert(
+            "uploads",
+            {
+                "platform": platform,
+                "remote_id": remote_id,
+                "status": status,
+                "job_id": job_id,
+                "details": json.dumps(details),
+            },
+        )
+
+    def recent(self, column: str, limit: int) -> List[str]:
+        if column not in ("topic", "format", "hook"):
+            raise ValueError(f"Unknown pick column: {column}")
+        rows = self._query(f"SELECT {column} FROM picks ORDER BY id DESC LIMIT ?", (limit,))
+        return [row[0] for row in reversed(rows) if row[0]]
+
+    def picks_since(self, seconds: float) -> List[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT created, mode, topic, format, hook FROM picks WHERE created >= ? ORDER BY created",
+            (time.time() - seconds,),
+        )
+        return [dict(row) for row in rows]
+
+    def picks_after(self, pick_id: int) -> List[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT id, created, topic, format FROM picks WHERE id > ? ORDER BY id",
+            (pick_id,),
+        )
+        return [dict(row) for row in rows]
+
+    def last_pick_id(self) -> int:
+        rows = self._query("SELECT MAX(id) FROM picks")
+        return int(rows[0][0] or 0)
+
+    def last_used_by_pair(self) -> Dict[Tuple[str, str], float]:
+        rows = self._query("SELECT topic, format, MAX(created) FROM picks GROUP BY topic, format")
+        return {(row[0], row[1]): row[2] for row in rows}
+
+    def last_used_since(self, column: str, since: float) -> Dict[str, float]:
+        if column not in ("topic", "format"):
+            raise ValueError(f"Unknown pick column: {column}")
+        rows = self._query(f"SELECT {column}, MAX(created) FROM picks WHERE created >= ? GROUP BY {column}", (since,))
+        return {row[0]: row[1] for row in rows}
+
+    def replace_rotation(self, rows: Iterable[Tuple[str, str, float, float, float, float]]) -> None:
+        """Rows of (topic, format, weight, used, due, jitter)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM rotation")
+            self._conn.executemany(
+                "INSERT INTO rotation (topic, format, weight, used, due, jitter) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def use_rotation(self, topic: str, format_name: str, used: float, interval: float, jitter: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE rotation SET used = ?, due = ? + ? / weight, jitter = ? "
+                "WHERE topic = ? AND format = ? AND used < ?",
+                (used, used, interval, jitter, topic, format_name, used),
+            )
+            self._conn.commit()
+
+    def rotation_front(self, limit: int) -> List[Dict[str, Any]]:
+        rows = self._query("SELECT topic, format, used, due FROM rotation ORDER BY due, jitter LIMIT ?", (limit,))
+        return [dict(row) for row in rows]
+
+    def rotation_used(self, topic: str, format_name: str) -> float:
+        rows = self._query("SELECT used FROM rotation WHERE topic = ? AND format = ?", (topic, format_name))
+        return float(rows[0][0]) if rows else 0.0
+
+    def speech_samples(self, voice: str, rate: str, limit: int = 20) -> List[Dict[str, float]]:
+        """Recent (audio_sec, predicted_sec) pairs for a voice at a speaking rate, from renders with a prediction."""
+        rows = self._query(
+            "SELECT audio_sec, json_extract(details, '$.predicted_sec') FROM renders "
+            "WHERE voice = ? AND json_extract(details, '$.edge_rate') = ? AND audio_sec > 0 "
+            "AND json_extract(details, '$.predicted_sec') > 0 ORDER BY id DESC LIMIT ?",
+            (voice, rate, limit),
+        )
+        return [{"audio_sec": row[0], "predicted_sec": row[1]} for row in rows]
+
+    def uploaded(self, job_id: str, platform: str) -> bool:
+        rows = self._query(
+            "SELECT 1 FROM uploads WHERE job_id = ? AND platform = ? LIMIT 1", (job_id, platform)
+        )
+        return bool(rows)
+
+    def record_fingerprint(self, fingerprint: int, bands: List[int], job_id: str = "") -> int:
+        row: Dict[str, Any] = {"job_id": job_id, "simhash": _signed64(fingerprint)}
+        row.update({f"band{idx}": band for idx, band in enumerate(bands)})
+        return self._insert("fingerprints", row)
+
+    def fingerprints_sharing_band(self, bands: List[int]) -> List[int]:
+        where = " OR ".join(f"band{idx} = ?" for idx in range(len(bands)))
+        rows = self._query(f"SELECT simhash FROM fingerprints WHERE {where}", bands)
+        return [row[0] & 0xFFFFFFFFFFFFFFFF for row in rows]
+
+    def script_seen(self, script: str) -> bool:
+        rows = self._query("SELECT 1 FROM scripts WHERE script_hash = ? LIMIT 1", (script_hash(script),))
+        return bool(rows)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def import_json(self, path: Path = LEGACY_HISTORY_PATH) -> int:
+        """One-time import of the old content_history.json lists; returns picks imported."""
+        if self.get_meta("imported_json") or not path.exists():
+            return 0
+        try:
+            legacy = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            legacy = {}
+
+        topics = legacy.get("topics", [])
+        formats = legacy.get("formats", [])
+        hooks = legacy.get("hooks", [])
+        # The JSON lists were trimmed independently; align them from the newest end.
+        count = max(len(topics), len(formats), len(hooks))
+        topics, formats, hooks = ([""] * (count - len(items)) + items for items in (topics, formats, hooks))
+
+        base = time.time() - count * 86400
+        with self._lock:
+            for idx, (topic, format_name, hook) in enumerate(zip(topics, formats, hooks)):
+                self._conn.execute(
+                    "INSERT INTO picks (created, mode, topic, format, hook, job_id) VALUES (?, ?, ?, ?, ?, ?)",
+                    (base + idx * 86400, "imported", topic, format_name, hook, ""),
+                )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('imported_json', ?)", (path.as_posix(),))
+            self._conn.commit()
+        return count
+
+    def prune(self, text_days: float = SCRIPT_TEXT_DAYS) -> int:
+        """Blank script text older than ``text_days`` and compact the file; returns rows trimmed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE scripts SET script = '' WHERE created < ? AND script != ''", (time.time() - text_days * 86400,)
+            )
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+        return cursor.rowcount
+
+    def export_compact(self, path: Path) -> Dict[str, int]:
+        """Text snapshot of the ledger (no script text, recent renders only) that can reseed an empty database."""
+        data: Dict[str, List[Dict[str, Any]]] = {}
+        for table, columns in EXPORT_COLUMNS.items():
+            if table == "renders":
+                recent = f"SELECT * FROM renders ORDER BY id DESC LIMIT {EXPORT_RENDERS}"
+                sql = f"SELECT {columns} FROM ({recent}) ORDER BY id"
+            elif table == "meta":
+                # Rotation bookkeeping refers to local pick ids; a reseeded database rebuilds it.
+                sql = f"SELECT {columns} FROM meta WHERE key NOT LIKE 'rotation:%' ORDER BY key"
+            else:
+                sql = f"SELECT {columns} FROM {table} ORDER BY id"
+            data[table] = [dict(row) for row in self._query(sql)]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, indent=1, sort_keys=True), encoding="utf-8")
+        tmp.replace(path)
+        return {table: len(rows) for table, rows in data.items()}
+
+    def import_compact(self, path: Path) -> int:
+        """Reseed an empty database from export_compact(); returns picks imported."""
+        if not path.exists() or self._query("SELECT 1 FROM picks LIMIT 1"):
+            return 0
+        data = json.loads(path.read_text(encoding="utf-8"))
+        with self._lock:
+            for table in EXPORT_COLUMNS:
+                for row in data.get(table, []):
+                    if table == "scripts":
+                        row = {**row, "script": ""}
+                    columns = ", ".join(row)
+                    marks = ", ".join("?" for _ in row)
+                    verb = "INSERT OR REPLACE" if table == "meta" else "INSERT"
+                    self._conn.execute(f"{verb} INTO {table} ({columns}) VALUES ({marks})", tuple(row.values()))
+            self._conn.commit()
+        return len(data.get("picks", []))
+
+
+def export_path(db_path: Path) -> Path:
+    return db_path.with_suffix(".json")
+
+
+_store: Optional[HistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> HistoryStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+            # Fold the WAL back into the main file so the cached database is self-contained.
+            atexit.register(_store.close)
+            # The database lives in the Actions cache; the committed export reseeds it after an eviction.
+            reseeded = _store.import_compact(export_path(HISTORY_DB_PATH))
+            if reseeded:
+                print(f"Reseeded history with {reseeded} picks from {export_path(HISTORY_DB_PATH)}")
+            imported = _store.import_json()
+            if imported:
+                print(f"Imported {imported} picks from {LEGACY_HISTORY_PATH}")
+        return _store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Trim old script text and write the compact history export")
+    parser.add_argument("--db", default=str(HISTORY_DB_PATH))
+    parser.add_argument("--text-days", type=float, default=SCRIPT_TEXT_DAYS)
+    args = parser.parse_args()
+
+    db_path = Path(args.db)
+    store = HistoryStore(db_path)
+    trimmed = store.prune(args.text_days)
+    counts = store.export_compact(export_path(db_path))
+    store.close()
+    print(f"{db_path}: trimmed text of {trimmed} old script(s); exported {counts} to {export_path(db_path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from workspace import JOBS_DIR
+
+JOB_QUEUE_PATH = Path(os.getenv("SMBB_QUEUE_DB", str(JOBS_DIR / "queue.sqlite3")))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, mode, created);
+"""
+
+# rendering -> ready -> publishing -> published; failures end in "failed".
+STATUSES = ("rendering", "ready", "publishing", "published", "failed")
+
+
+class JobQueue:
+    """Rendered jobs waiting under jobs/<id>/ to be published, oldest first."""
+
+    def __init__(self, path: Path = JOB_QUEUE_PATH) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _set_status(self, job_id: str, status: str, error: str = "") -> None:
+        if status not in STATUSES:
+            raise ValueError(f"Unknown job status: {status}")
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE job_id = ?",
+                (status, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def add(self, job_id: str, mode: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, mode, status, created, updated) VALUES (?, ?, 'rendering', ?, ?)",
+                (job_id, mode, now, now),
+            )
+            self._conn.commit()
+
+    def mark_ready(self, job_id: str) -> None:
+        self._set_status(job_id, "ready")
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        self._set_status(job_id, "failed", error[:2000])
+
+    def mark_published(self, job_id: str) -> None:
+        self._set_status(job_id, "published")
+
+    def release(self, job_id: str, error: str) -> None:
+        """Put a job whose upload failed back at the head of the ready queue."""
+        self._set_status(job_id, "ready", error[:2000])
+
+    def count(self, status: str, mode: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND mode = ?", (status, mode)
+            ).fetchone()
+        return int(row[0])
+
+    def claim_next(self, mode: str) -> Optional[str]:
+        """Atomically move the oldest ready job of ``mode`` to publishing and return its id."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'ready' AND mode = ? ORDER BY created LIMIT 1",
+                (mode,),
+            ).fetchone()
+            if row is None:
+                self._conn.rollback()
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'publishing', attempts = attempts + 1, updated = ? WHERE job_id = ?",
+                (time.time(), row[0]),
+            )
+            self._conn.commit()
+        return str(row[0])
+
+    def abandon_stale(self, mode: str) -> List[str]:
+        """Jobs left in 'rendering' by a producer that died; they are marked failed."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'rendering' AND mode = ?", (mode,)
+            ).fetchall()
+        stale = [str(row[0]) for row in rows]
+        for job_id in stale:
+            self.mark_failed(job_id, "producer stopped before the job finished")
+        return stale
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT mode, status, COUNT(*) FROM jobs GROUP BY mode, status").fetchall()
+        result: Dict[str, Dict[str, Any]] = {}
+        for mode, status, count in rows:
+            result.setdefault(mode, {})[status] = count
+        return result
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from typing import Iterable, List, Optional
+
+from history_store import HistoryStore, get_store
+
+NEAR_DUP_MAX_DISTANCE = int(os.getenv("NEAR_DUP_MAX_DISTANCE", "3"))
+SHINGLE_WORDS = 3
+BAND_BITS = 16
+BANDS = 64 // BAND_BITS
+
+
+def _shingles(text: str) -> List[str]:
+    # Numbers are seeded per topic/format, so they should not make two bodies look different.
+    words = [re.sub(r"\d+", "#", word) for word in re.findall(r"[a-z0-9]+", text.lower())]
+    if len(words) < SHINGLE_WORDS:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word 3-grams; similar texts differ in few bits."""
+    counts = [0] * 64
+    for shingle in _shingles(text):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            counts[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if counts[bit] > 0)
+
+
+def bands(fingerprint: int) -> List[int]:
+    mask = (1 << BAND_BITS) - 1
+    return [fingerprint >> (band * BAND_BITS) & mask for band in range(BANDS)]
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDupIndex:
+    """SimHash fingerprints of every recorded script body, kept in the history ledger."""
+
+    # Fingerprints within three bits agree on at least one of the four 16-bit bands, so a lookup only
+    # compares rows sharing an indexed band.
+
+    def __init__(self, store: Optional[HistoryStore] = None, max_distance: int = NEAR_DUP_MAX_DISTANCE) -> None:
+        if max_distance >= BANDS:
+            raise ValueError(f"max_distance must be below {BANDS} for the band lookup to find every match")
+        self.store = store or get_store()
+        self.max_distance = max_distance
+
+    def nearest(self, text: str, extra: Iterable[int] = ()) -> Optional[int]:
+        """Hamming distance to the closest known fingerprint within range, or None."""
+        fingerprint = simhash(text)
+        candidates = list(self.store.fingerprints_sharing_band(bands(fingerprint))) + list(extra)
+        distances = [hamming(fingerprint, other) for other in candidates]
+        close = [distance for distance in distances if distance <= self.max_distance]
+        return min(close) if close else None
+
+    def add(self, text: str, job_id: str = "") -> int:
+        fingerprint = simhash(text)
+        self.store.record_fingerprint(fingerprint, bands(fingerprint), job_id)
+        return fingerprint
+
+
+_index: Optional[NearDupIndex] = None
+
+
+def get_index() -> NearDupIndex:
+    global _index
+    if _index is None:
+        _index = NearDupIndex()
+    return _index
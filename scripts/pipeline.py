@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    func: Callable[..., Dict[str, Any]]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    # Stages that must finish first although none of their outputs is passed in (e.g. they warm a cache).
+    after: Tuple[str, ...] = ()
+
+
+def _producers(stages: List[Stage]) -> Dict[str, str]:
+    producers: Dict[str, str] = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(f"Output '{output}' is produced by both '{producers[output]}' and '{stage.name}'")
+            producers[output] = stage.name
+    return producers
+
+
+def stage_dependencies(stages: List[Stage], initial: Set[str]) -> Dict[str, Set[str]]:
+    producers = _producers(stages)
+    deps: Dict[str, Set[str]] = {}
+    for stage in stages:
+        deps[stage.name] = set()
+        for name in stage.inputs:
+            if name in producers:
+                deps[stage.name].add(producers[name])
+            elif name not in initial:
+                raise ValueError(f"Stage '{stage.name}' needs '{name}' but nothing produces it")
+        for name in stage.after:
+            if not any(other.name == name for other in stages):
+                raise ValueError(f"Stage '{stage.name}' runs after unknown stage '{name}'")
+            deps[stage.name].add(name)
+    return deps
+
+
+def topological_order(stages: List[Stage], deps: Dict[str, Set[str]]) -> List[Stage]:
+    ordered: List[Stage] = []
+    placed: Set[str] = set()
+    while len(ordered) < len(stages):
+        ready = [stage for stage in stages if stage.name not in placed and deps[stage.name] <= placed]
+        if not ready:
+            raise ValueError("Stage graph has a cycle")
+        ordered += ready
+        placed.update(stage.name for stage in ready)
+    return ordered
+
+
+def critical_path(deps: Dict[str, Set[str]], durations: Dict[str, float]) -> Tuple[List[str], float]:
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+
+    def visit(name: str) -> float:
+        if name not in finish:
+            parent = max(deps[name], key=visit, default=None)
+            previous[name] = parent
+            finish[name] = (visit(parent) if parent else 0.0) + durations.get(name, 0.0)
+        return finish[name]
+
+    if not deps:
+        return [], 0.0
+    end = max(deps, key=visit)
+    path: List[str] = []
+    cursor: Optional[str] = end
+    while cursor:
+        path.append(cursor)
+        cursor = previous[cursor]
+    return list(reversed(path)), finish[end]
+
+
+def run_stages(
+    stages: List[Stage],
+    context: Optional[Dict[str, Any]] = None,
+    max_workers: int = 4,
+    skip: Optional[Set[str]] = None,
+    on_complete: Optional[Callable[[Stage, Dict[str, Any]], None]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Run stages as soon as their inputs exist; stages in ``skip`` must have their outputs in ``context``."""
+    context = dict(context or {})
+    skip = set(skip or ())
+    deps = stage_dependencies(stages, set(context))
+    by_name = {stage.name: stage for stage in stages}
+
+    done: Set[str] = set(skip)
+    timings: Dict[str, Dict[str, float]] = {}
+    running: Dict[Future, Stage] = {}
+    started_at = time.perf_counter()
+
+    def submit_ready(pool: ThreadPoolExecutor) -> None:
+        active = {stage.name for stage in running.values()}
+        for stage in stages:
+            if stage.name in done or stage.name in active:
+                continue
+            if deps[stage.name] <= done:
+                timings[stage.name] = {"start": time.perf_counter() - started_at}
+                kwargs = {name: context[name] for name in stage.inputs}
+                running[pool.submit(stage.func, **kwargs)] = stage
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        submit_ready(pool)
+        while running:
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                try:
+                    produced = future.result() or {}
+                except Exception:
+                    for pending in running:
+                        pending.cancel()
+                    raise
+                missing = [name for name in stage.outputs if name not in produced]
+                if missing:
+                    raise RuntimeError(f"Stage '{stage.name}' did not produce {', '.join(missing)}")
+                context.update(produced)
+                end = time.perf_counter() - started_at
+                timings[stage.name]["end"] = end
+                timings[stage.name]["duration"] = end - timings[stage.name]["start"]
+                print(f"Stage {stage.name} done in {timings[stage.name]['duration']:.2f}s")
+                done.add(stage.name)
+                if on_complete:
+                    on_complete(stage, produced)
+            submit_ready(pool)
+
+    not_run = [name for name in by_name if name not in done]
+    if not_run:
+        raise RuntimeError(f"Stages never became ready: {', '.join(not_run)}")
+
+    durations = {name: timing["duration"] for name, timing in timings.items()}
+    path, path_sec = critical_path({name: deps[name] & set(durations) for name in durations}, durations)
+    metrics = {
+        "wall_sec": round(time.perf_counter() - started_at, 3),
+        "serial_sec": round(sum(durations.values()), 3),
+        "critical_path": path,
+        "critical_path_sec": round(path_sec, 3),
+        "stages": {
+            name: {key: round(value, 3) for key, value in timing.items()} for name, timing in timings.items()
+        },
+        "resumed": sorted(skip),
+    }
+    return context, metrics
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import os
+import statistics
+from typing import Any, Dict, Optional
+
+from content_factory import describe
+from history_store import HistoryStore, get_store
+from script_catalog import CATALOG_RATE, get_catalog
+from script_model import Script
+from script_text import predict_duration
+from validation import check_text
+
+MIN_AUDIO_SEC = 4.0
+YOUTUBE_SHORTS_MAX_SEC = float(os.getenv("YOUTUBE_SHORTS_MAX_SEC", "60"))
+# 0 means "use the creator limit the last TikTok upload reported", if any.
+TIKTOK_MAX_SEC = float(os.getenv("TIKTOK_MAX_SEC", "0"))
+TIKTOK_LIMIT_META_KEY = "tiktok_max_video_post_duration_sec"
+CALIBRATION_SAMPLES = 20
+# Headroom for the end-of-audio padding and prediction error.
+DURATION_MARGIN = 0.95
+
+
+def duration_limits(mode: str, store: Optional[HistoryStore] = None) -> Dict[str, float]:
+    limits: Dict[str, float] = {}
+    if mode == "short":
+        limits["youtube_shorts"] = YOUTUBE_SHORTS_MAX_SEC
+    if os.getenv("TIKTOK_ACCESS_TOKEN", "").strip():
+        tiktok = TIKTOK_MAX_SEC or float((store or get_store()).get_meta(TIKTOK_LIMIT_META_KEY) or 0)
+        if tiktok:
+            limits["tiktok"] = tiktok
+    return limits
+
+
+def calibration_factor(voice: str, rate: str, store: Optional[HistoryStore] = None) -> float:
+    """Median ratio of measured to predicted audio length over recent renders with this voice and rate."""
+    samples = (store or get_store()).speech_samples(voice, rate, CALIBRATION_SAMPLES)
+    ratios = [sample["audio_sec"] / sample["predicted_sec"] for sample in samples]
+    return statistics.median(ratios) if ratios else 1.0
+
+
+def unit_sec(unit: Dict[str, Any], rate: str) -> float:
+    # Lessons and CTAs are looked up in the prebuilt catalog; intros/outros are predicted live.
+    if rate == CATALOG_RATE:
+        cached = get_catalog().unit_sec(str(unit["id"]), str(unit["spoken"]))
+        if cached is not None:
+            return cached
+    return predict_duration(str(unit["spoken"]), rate=rate)
+
+
+def raw_audio_sec(script: Script, rate: str) -> float:
+    """Uncalibrated prediction; this is what renders record, so calibration compares like with like."""
+    return sum(unit_sec(unit, rate) for unit in script.tts_units())
+
+
+def predict_audio_sec(script: Script, voice: str, rate: str) -> float:
+    return raw_audio_sec(script, rate) * calibration_factor(voice, rate)
+
+
+def plan_script(script: Script, voice: str, rate: str) -> Dict[str, Any]:
+    errors, warnings = check_text(script.text, script.title, describe(script.tags))
+    raw = raw_audio_sec(script, rate)
+    predicted = raw * calibration_factor(voice, rate)
+    limits = duration_limits(script.mode)
+
+    if predicted < MIN_AUDIO_SEC:
+        errors.append(f"Predicted audio is too short ({predicted:.1f}s).")
+    for platform, limit in limits.items():
+        if predicted > limit * DURATION_MARGIN:
+            errors.append(f"Predicted audio {predicted:.1f}s exceeds the {platform} limit of {limit:.0f}s.")
+
+    return {
+        "ok": not errors,
+        "errors": errors,
+        "warnings": warnings,
+        "predicted_sec": round(predicted, 2),
+        "raw_sec": round(raw, 2),
+        "limits": limits,
+        "voice": voice,
+        "rate": rate,
+    }
+
+
+class PlanGate:
+    """Accept predicate for make_short/make_long; keeps the plan of the accepted script."""
+
+    def __init__(self, voice: str, rate: str) -> None:
+        self.voice = voice
+        self.rate = rate
+        self.plan: Dict[str, Any] = {}
+
+    def __call__(self, script: Script) -> bool:
+        self.plan = plan_script(script, self.voice, self.rate)
+        for msg in self.plan["errors"]:
+            print(f"Plan: {msg}")
+        return self.plan["ok"]
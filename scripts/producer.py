@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import argparse
+import os
+import secrets
+import time
+import traceback
+from datetime import datetime, timezone
+
+from generate_video import run_job
+from job_queue import JobQueue
+from workspace import Workspace
+
+PRODUCER_BUFFER = int(os.getenv("PRODUCER_BUFFER", "3"))
+PRODUCER_IDLE_SEC = int(os.getenv("PRODUCER_IDLE_SEC", "600"))
+PRODUCER_RETRY_SEC = int(os.getenv("PRODUCER_RETRY_SEC", "300"))
+
+
+def new_job_id(mode: str) -> str:
+    # The suffix keeps jobs enqueued within the same second out of each other's workspace.
+    return f"{mode}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{secrets.token_hex(3)}"
+
+
+def produce_one(queue: JobQueue, mode: str, scratch: str) -> bool:
+    job_id = new_job_id(mode)
+    queue.add(job_id, mode)
+    print(f"Producing {job_id}")
+    # content_factory and the history ledger read the job id from the environment.
+    os.environ["SMBB_JOB_ID"] = job_id
+    workspace = Workspace.create(job_id, scratch)
+    try:
+        run_job(workspace, mode)
+    except Exception as exc:
+        traceback.print_exc()
+        queue.mark_failed(job_id, f"{type(exc).__name__}: {exc}")
+        return False
+    finally:
+        os.environ.pop("SMBB_JOB_ID", None)
+    workspace.cleanup_scratch()
+    queue.mark_ready(job_id)
+    print(f"Ready: {job_id}")
+    return True
+
+
+def fill_buffer(queue: JobQueue, mode: str, buffer: int, scratch: str) -> bool:
+    """Render until ``buffer`` jobs are ready; returns False if a render failed."""
+    while queue.count("ready", mode) < buffer:
+        if not produce_one(queue, mode, scratch):
+            return False
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render videos ahead of the publish schedule")
+    parser.add_argument("--mode", default=os.getenv("VIDEO_MODE", "short").strip().lower())
+    parser.add_argument("--buffer", type=int, default=PRODUCER_BUFFER, help="Ready jobs to keep queued")
+    parser.add_argument("--scratch", default=os.getenv("SMBB_SCRATCH_DIR", ""), help="Scratch base, or 'tmpfs'")
+    parser.add_argument("--once", action="store_true", help="Fill the buffer once and exit")
+    args = parser.parse_args()
+
+    queue = JobQueue()
+    stale = queue.abandon_stale(args.mode)
+    if stale:
+        print(f"Marked interrupted jobs as failed: {', '.join(stale)}")
+
+    while True:
+        ok = fill_buffer(queue, args.mode, args.buffer, args.scratch)
+        print(f"Queue: {queue.summary()}")
+        if args.once:
+            if not ok:
+                raise SystemExit(1)
+            return
+        time.sleep(PRODUCER_IDLE_SEC if ok else PRODUCER_RETRY_SEC)
+
+
+if __name__ == "__main__":
+    main()
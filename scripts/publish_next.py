@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List
+
+from history_store import get_store
+from job_queue import JobQueue
+from validation import assert_ready_for_upload
+from workspace import Workspace
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+def upload_targets() -> List[str]:
+    targets = [item.strip() for item in os.getenv("PUBLISH_TARGETS", "youtube,tiktok").split(",") if item.strip()]
+    if "tiktok" in targets and not os.getenv("TIKTOK_ACCESS_TOKEN", "").strip():
+        print("TIKTOK_ACCESS_TOKEN not set; skipping TikTok")
+        targets.remove("tiktok")
+    return targets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Upload the oldest ready job from the producer queue")
+    parser.add_argument("--mode", default=os.getenv("VIDEO_MODE", "short").strip().lower())
+    args = parser.parse_args()
+
+    queue = JobQueue()
+    job_id = queue.claim_next(args.mode)
+    if not job_id:
+        raise SystemExit(f"No ready {args.mode} job in {queue.path}")
+
+    print(f"Publishing {job_id}")
+    try:
+        assert_ready_for_upload(Workspace.create(job_id))
+        for target in upload_targets():
+            # A retried job must not post twice to a platform that already took it.
+            if get_store().uploaded(job_id, target):
+                print(f"{job_id} already uploaded to {target}")
+                continue
+            subprocess.run([sys.executable, str(SCRIPTS_DIR / f"upload_{target}.py"), "--job", job_id], check=True)
+    except Exception as exc:
+        queue.release(job_id, f"{type(exc).__name__}: {exc}")
+        raise
+    queue.mark_published(job_id)
+    print(f"Published: {job_id}")
+
+
+if __name__ == "__main__":
+    main()
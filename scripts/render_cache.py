@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from asset_manifest import CACHE_DIR, file_digest
+
+RENDER_CACHE_DIR = CACHE_DIR / "renders"
+RENDER_CACHE_MAX_MB = int(os.getenv("RENDER_CACHE_MAX_MB", "2048"))
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, Path):
+        return {"file_sha256": file_digest(value)} if value.exists() else {"missing": value.as_posix()}
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    return value
+
+
+class RenderCache:
+    """Finished renders stored by the hash of everything that went into them."""
+
+    def __init__(self, root: Path = RENDER_CACHE_DIR, max_bytes: int = RENDER_CACHE_MAX_MB * 1024 * 1024) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self._events: List[Dict[str, str]] = []
+
+    def key(self, **inputs: Any) -> str:
+        payload = json.dumps(_canonical(inputs), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.mp4"
+
+    def contains(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def _record(self, key: str, hit: bool, dest: Path) -> None:
+        with self._lock:
+            self._stats["hits" if hit else "misses"] += 1
+            self._events.append({"key": key[:16], "result": "hit" if hit else "miss", "output": dest.as_posix()})
+
+    def get(self, key: str, dest: Path) -> bool:
+        cached = self._path(key)
+        hit = cached.exists()
+        if hit:
+            shutil.copyfile(cached, dest)
+            os.utime(cached)
+        self._record(key, hit, dest)
+        return hit
+
+    def miss(self, key: str, dest: Path) -> None:
+        """Count a lookup that was answered without get(), e.g. after contains() came back False."""
+        self._record(key, False, dest)
+
+    def put(self, key: str, src: Path) -> None:
+        cached = self._path(key)
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix(f".{os.getpid()}.part")
+        shutil.copyfile(src, tmp)
+        tmp.replace(cached)
+        with self._lock:
+            self._stats["stored"] += 1
+        self.evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            entries: List[Tuple[float, int, Path]] = []
+            for path in self.root.glob("*/*.mp4"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:  # evicted by another worker process
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                self._stats["evicted"] += 1
+
+    def reset(self) -> None:
+        """Start counting afresh, e.g. for the next job in a long-lived process."""
+        with self._lock:
+            self._stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+            self._events = []
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "renders": list(self._events)}
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import os
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Layout coordinates in build_visual_filter() are authored for this canvas and
+# scaled to the profile resolution.
+BASE_WIDTH = 1080
+BASE_HEIGHT = 1920
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    name: str
+    width: int
+    height: int
+    fps: int
+    preset: str
+    crf: int
+    maxrate_kbps: Optional[int] = None
+    bufsize_kbps: Optional[int] = None
+    keyint_sec: Optional[float] = None
+    audio_bitrate: str = ""
+    # Upper bound for the finished file, checked by validation so uploads stay
+    # inside the single-request sizes TikTok and YouTube handle reliably.
+    max_bytes_per_sec: Optional[int] = None
+
+    @property
+    def scale(self) -> float:
+        return self.width / BASE_WIDTH
+
+    def px(self, value: float) -> int:
+        return int(round(value * self.scale))
+
+    def video_args(self) -> List[str]:
+        args = [
+            "-r",
+            str(self.fps),
+            "-c:v",
+            "libx264",
+            "-preset",
+            self.preset,
+            "-crf",
+            str(self.crf),
+        ]
+        if self.maxrate_kbps:
+            args += ["-maxrate", f"{self.maxrate_kbps}k"]
+            args += ["-bufsize", f"{self.bufsize_kbps or self.maxrate_kbps * 2}k"]
+        if self.keyint_sec:
+            gop = max(1, int(round(self.keyint_sec * self.fps)))
+            args += ["-g", str(gop), "-keyint_min", str(gop)]
+        args += ["-pix_fmt", "yuv420p"]
+        return args
+
+    def audio_args(self) -> List[str]:
+        args = ["-c:a", "aac"]
+        if self.audio_bitrate:
+            args += ["-b:a", self.audio_bitrate]
+        return args
+
+    def within_budget(self, size_bytes: int, duration_sec: float) -> bool:
+        if not self.max_bytes_per_sec or duration_sec <= 0:
+            return True
+        return size_bytes / duration_sec <= self.max_bytes_per_sec
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+RENDER_PROFILES: Dict[str, RenderProfile] = {
+    "final": RenderProfile(
+        name="final",
+        width=1080,
+        height=1920,
+        fps=30,
+        preset="veryfast",
+        crf=23,
+    ),
+    "draft": RenderProfile(
+        name="draft",
+        width=540,
+        height=960,
+        fps=15,
+        preset="ultrafast",
+        crf=32,
+    ),
+    "youtube": RenderProfile(
+        name="youtube",
+        width=1080,
+        height=1920,
+        fps=30,
+        preset="veryfast",
+        crf=21,
+        maxrate_kbps=8000,
+        bufsize_kbps=16000,
+        keyint_sec=2.0,
+        audio_bitrate="160k",
+        max_bytes_per_sec=1_050_000,
+    ),
+    "tiktok": RenderProfile(
+        name="tiktok",
+        width=1080,
+        height=1920,
+        fps=30,
+        preset="veryfast",
+        crf=23,
+        maxrate_kbps=5000,
+        bufsize_kbps=10000,
+        keyint_sec=2.0,
+        audio_bitrate="128k",
+        max_bytes_per_sec=700_000,
+    ),
+}
+
+DEFAULT_PROFILE = "final"
+
+
+def get_profile(name: str = "") -> RenderProfile:
+    key = (name or os.getenv("RENDER_PROFILE", "") or DEFAULT_PROFILE).strip().lower()
+    if key not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile '{key}' (choose from {', '.join(RENDER_PROFILES)})")
+    return RENDER_PROFILES[key]
+
+
+@dataclass(frozen=True)
+class OutputVariant:
+    """A destination file cut from the shared composite in the same ffmpeg run."""
+
+    name: str
+    profile: str
+    width: int
+    height: int
+    modes: Tuple[str, ...] = ("short", "long")
+    # Captions are raised by this much (1080x1920 canvas pixels) to clear the
+    # platform's own buttons and description overlay.
+    caption_lift: int = 0
+    # Key into the plan's duration limits (plan_gate.duration_limits); the output is
+    # cut there if the audio somehow runs longer.
+    limit: str = ""
+
+    @property
+    def encoder(self) -> RenderProfile:
+        return RENDER_PROFILES[self.profile]
+
+    @property
+    def landscape(self) -> bool:
+        return self.width > self.height
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+OUTPUT_VARIANTS: Dict[str, OutputVariant] = {
+    "shorts": OutputVariant(
+        name="shorts",
+        profile="youtube",
+        width=1080,
+        height=1920,
+        modes=("short",),
+        limit="youtube_shorts",
+    ),
+    "tiktok": OutputVariant(
+        name="tiktok",
+        profile="tiktok",
+        width=1080,
+        height=1920,
+        caption_lift=180,
+        limit="tiktok",
+    ),
+    "landscape": OutputVariant(
+        name="landscape",
+        profile="youtube",
+        width=1920,
+        height=1080,
+    ),
+}
+
+
+def get_variants(mode: str, names: str = "") -> List[OutputVariant]:
+    """Variants named in VIDEO_VARIANTS (comma separated) that apply to this mode."""
+    raw = names or os.getenv("VIDEO_VARIANTS", "")
+    variants: List[OutputVariant] = []
+    for key in (part.strip().lower() for part in raw.split(",")):
+        if not key:
+            continue
+        if key not in OUTPUT_VARIANTS:
+            raise ValueError(f"Unknown output variant '{key}' (choose from {', '.join(OUTPUT_VARIANTS)})")
+        variant = OUTPUT_VARIANTS[key]
+        if mode in variant.modes and variant not in variants:
+            variants.append(variant)
+    return variants
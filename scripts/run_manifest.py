@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple
+
+from asset_manifest import file_digest
+from pipeline import Stage, stage_dependencies, topological_order
+
+RUN_MANIFEST_PATH = Path("out/run_manifest.json")
+
+
+def _encode(value: Any) -> Dict[str, Any]:
+    if isinstance(value, Path):
+        return {"path": value.as_posix(), "sha256": file_digest(value) if value.exists() else ""}
+    return {"value": value}
+
+
+def _decode(record: Dict[str, Any]) -> Tuple[Any, bool]:
+    if "path" not in record:
+        return record.get("value"), True
+    path = Path(record["path"])
+    valid = path.exists() and bool(record.get("sha256")) and file_digest(path) == record["sha256"]
+    return path, valid
+
+
+class RunManifest:
+    """Completed stages of one run, with their outputs and artifact hashes."""
+
+    def __init__(self, path: Path = RUN_MANIFEST_PATH) -> None:
+        self.path = path
+        self.data: Dict[str, Any] = {}
+
+    def load(self) -> bool:
+        if not self.path.exists():
+            return False
+        try:
+            self.data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            self.data = {}
+        return bool(self.data)
+
+    def start(self, run_key: Dict[str, Any]) -> None:
+        self.data = {
+            "run_key": run_key,
+            "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "stages": {},
+        }
+        self._save()
+
+    def matches(self, run_key: Dict[str, Any]) -> bool:
+        return self.data.get("run_key") == run_key
+
+    def record(self, stage: Stage, outputs: Dict[str, Any]) -> None:
+        self.data.setdefault("stages", {})[stage.name] = {
+            "completed": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "outputs": {name: _encode(outputs[name]) for name in stage.outputs},
+        }
+        self._save()
+
+    def resumable(self, stages: List[Stage], initial: Set[str]) -> Tuple[Set[str], Dict[str, Any]]:
+        """Stages whose recorded artifacts still verify, and only if everything upstream does too."""
+        deps = stage_dependencies(stages, initial)
+        recorded = self.data.get("stages", {})
+        valid: Set[str] = set()
+        restored: Dict[str, Any] = {}
+
+        for stage in topological_order(stages, deps):
+            entry = recorded.get(stage.name)
+            if not entry or not deps[stage.name] <= valid:
+                continue
+            outputs: Dict[str, Any] = {}
+            ok = True
+            for name in stage.outputs:
+                record = entry.get("outputs", {}).get(name)
+                if record is None:
+                    ok = False
+                    break
+                value, verified = _decode(record)
+                ok = ok and verified
+                outputs[name] = value
+            if ok:
+                valid.add(stage.name)
+                restored.update(outputs)
+            else:
+                print(f"Checkpoint for stage {stage.name} is stale; it will run again")
+        return valid, restored
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.data, indent=2), encoding="utf-8")
+        tmp.replace(self.path)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict
+
+RUN_REPORT_PATH = Path("out/run_report.json")
+# Pipeline stages run on threads and each merges its own fields into the same report.
+_lock = threading.Lock()
+
+
+def read_run_report(path: Path = RUN_REPORT_PATH) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def update_run_report(path: Path = RUN_REPORT_PATH, **fields: Any) -> Dict[str, Any]:
+    with _lock:
+        report = read_run_report(path)
+        report.update(fields)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+    return report
+
+
+def reset_run_report(path: Path = RUN_REPORT_PATH) -> None:
+    with _lock:
+        path.unlink(missing_ok=True)
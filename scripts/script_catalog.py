@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import content_factory
+import script_text
+from channels import current_channel
+from content_factory import CTA_OPTIONS, HOOK_TEMPLATES, cta_segment, lesson_segments
+from script_text import predict_duration, word_count
+from topic_corpus import TOPIC_DB_PATH, TopicCorpus, get_corpus, supported_formats
+
+# CTAs are per channel, so every channel but the default keeps its own catalog.
+_channel = current_channel()
+CATALOG_PATH = TOPIC_DB_PATH.with_name(
+    "script_catalog.sqlite3" if _channel.is_default else f"script_catalog_{_channel.name}.sqlite3"
+)
+CATALOG_RATE = os.getenv("EDGE_RATE", "+4%")
+
+SCHEMA = """
+CREATE TABLE lessons (
+    topic TEXT NOT NULL,
+    topic_id TEXT NOT NULL,
+    format TEXT NOT NULL,
+    hook INTEGER NOT NULL,
+    spoken TEXT NOT NULL,
+    words INTEGER NOT NULL,
+    predicted_sec REAL NOT NULL,
+    PRIMARY KEY (topic, format, hook)
+);
+CREATE INDEX lessons_format ON lessons (format, predicted_sec);
+CREATE UNIQUE INDEX lessons_id ON lessons (topic_id, format, hook);
+CREATE INDEX lessons_duration ON lessons (predicted_sec);
+
+CREATE TABLE ctas (
+    cta INTEGER PRIMARY KEY,
+    spoken TEXT NOT NULL,
+    words INTEGER NOT NULL,
+    predicted_sec REAL NOT NULL
+);
+
+-- Every (topic, format, hook variant, CTA) short, without storing the cross product.
+CREATE VIEW shorts AS
+SELECT l.topic, l.topic_id, l.format, l.hook, c.cta,
+       l.spoken || ' ' || c.spoken AS spoken,
+       l.words + c.words AS words,
+       l.predicted_sec + c.predicted_sec AS predicted_sec
+FROM lessons l CROSS JOIN ctas c;
+
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def catalog_stamp(corpus: TopicCorpus) -> str:
+    """Changes whenever the corpus, the script templates or the duration model change."""
+    digest = hashlib.sha256()
+    digest.update(corpus.stamp().encode("utf-8"))
+    for module in (content_factory, script_text, sys.modules[__name__]):
+        digest.update(Path(module.__file__).read_bytes())
+    digest.update(f"{script_text.BASE_WORDS_PER_SEC}:{CATALOG_RATE}".encode("utf-8"))
+    digest.update(json.dumps(CTA_OPTIONS).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_catalog(path: Path = CATALOG_PATH, corpus: Optional[TopicCorpus] = None) -> Dict[str, int]:
+    corpus = corpus or get_corpus()
+    lessons = []
+    for entry in corpus.entries():
+        for format_name in supported_formats(entry):
+            for hook in range(len(HOOK_TEMPLATES[format_name])):
+                spoken = " ".join(segment.spoken_text for segment in lesson_segments(entry, format_name, hook))
+                lessons.append(
+                    (
+                        entry["topic"],
+                        entry["id"],
+                        format_name,
+                        hook,
+                        spoken,
+                        word_count(spoken),
+                        round(predict_duration(spoken, rate=CATALOG_RATE), 2),
+                    )
+                )
+    ctas = []
+    for idx in range(len(CTA_OPTIONS)):
+        spoken = cta_segment(idx).spoken_text
+        ctas.append((idx, spoken, word_count(spoken), round(predict_duration(spoken, rate=CATALOG_RATE), 2)))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(str(tmp))
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT INTO lessons VALUES (?, ?, ?, ?, ?, ?, ?)", lessons)
+        conn.executemany("INSERT INTO ctas VALUES (?, ?, ?, ?)", ctas)
+        conn.execute("INSERT INTO meta (key, value) VALUES ('stamp', ?)", (catalog_stamp(corpus),))
+        conn.commit()
+    finally:
+        conn.close()
+    tmp.replace(path)
+    return {"lessons": len(lessons), "ctas": len(ctas), "shorts": len(lessons) * len(ctas)}
+
+
+class ScriptCatalog:
+    """Read side of the catalog; built on first use and rebuilt when it is stale."""
+
+    def __init__(self, path: Path = CATALOG_PATH, corpus: Optional[TopicCorpus] = None) -> None:
+        self.path = path
+        self.corpus = corpus or get_corpus()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if not self.is_current():
+                counts = build_catalog(self.path, self.corpus)
+                print(f"Built script catalog: {counts['lessons']} lessons, {counts['shorts']} shorts")
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+
+    def is_current(self) -> bool:
+        if not self.path.exists():
+            return False
+        try:
+            conn = sqlite3.connect(str(self.path))
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'stamp'").fetchone()
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError:
+            return False
+        return bool(row) and row[0] == catalog_stamp(self.corpus)
+
+    def _rows(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self._db().execute(sql, params)]
+
+    def lesson(self, topic: str, format_name: str, hook: int) -> Optional[Dict[str, Any]]:
+        rows = self._rows(
+            "SELECT * FROM lessons WHERE topic = ? AND format = ? AND hook = ?", (topic, format_name, hook)
+        )
+        return rows[0] if rows else None
+
+    def short(self, topic: str, format_name: str, hook: int, cta: int) -> Optional[Dict[str, Any]]:
+        lesson = self.lesson(topic, format_name, hook)
+        rows = self._rows("SELECT * FROM ctas WHERE cta = ?", (cta,))
+        if not lesson or not rows:
+            return None
+        return {
+            **lesson,
+            "cta": cta,
+            "spoken": f"{lesson['spoken']} {rows[0]['spoken']}",
+            "words": lesson["words"] + rows[0]["words"],
+            "predicted_sec": round(lesson["predicted_sec"] + rows[0]["predicted_sec"], 2),
+        }
+
+    def unit_sec(self, unit_id: str, spoken: str) -> Optional[float]:
+        """Predicted seconds for a lesson or CTA synthesis unit, if the catalog holds exactly this text."""
+        if unit_id.startswith("cta/"):
+            rows = self._rows("SELECT spoken, predicted_sec FROM ctas WHERE cta = ?", (int(unit_id[4:]),))
+        else:
+            topic_id, _, rest = unit_id.partition("/")
+            format_name, _, hook = rest.partition("/h")
+            if not hook.isdigit():
+                return None
+            rows = self._rows(
+                "SELECT spoken, predicted_sec FROM lessons WHERE topic_id = ? AND format = ? AND hook = ?",
+                (topic_id, format_name, int(hook)),
+            )
+        return rows[0]["predicted_sec"] if rows and rows[0]["spoken"] == spoken else None
+
+    def lessons_within(self, max_sec: float, format_name: str = "", limit: int = 100) -> List[Dict[str, Any]]:
+        if format_name:
+            return self._rows(
+                "SELECT * FROM lessons WHERE format = ? AND predicted_sec <= ? ORDER BY predicted_sec DESC LIMIT ?",
+                (format_name, max_sec, limit),
+            )
+        return self._rows(
+            "SELECT * FROM lessons WHERE predicted_sec <= ? ORDER BY predicted_sec DESC LIMIT ?", (max_sec, limit)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self._rows(
+            "SELECT COUNT(*) AS lessons, MIN(predicted_sec) AS min_sec, "
+            "AVG(predicted_sec) AS avg_sec, MAX(predicted_sec) AS max_sec FROM lessons"
+        )
+        return rows[0]
+
+
+_catalog: Optional[ScriptCatalog] = None
+
+
+def get_catalog() -> ScriptCatalog:
+    global _catalog
+    if _catalog is None:
+        _catalog = ScriptCatalog()
+    return _catalog
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Expand every topic/format/hook/CTA script into the catalog")
+    parser.add_argument("--out", default=str(CATALOG_PATH))
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the catalog is current")
+    args = parser.parse_args()
+
+    catalog = ScriptCatalog(Path(args.out))
+    if args.force or not catalog.is_current():
+        counts = build_catalog(catalog.path, catalog.corpus)
+        print(f"Catalog {args.out}: {counts['lessons']} lessons x {counts['ctas']} CTAs = {counts['shorts']} shorts")
+    else:
+        print(f"Catalog {args.out} is current")
+    print("Predicted lesson seconds:", catalog.stats())
+
+
+if __name__ == "__main__":
+    main()
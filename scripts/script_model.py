@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+SEGMENT_KINDS = ("hook", "body", "cta", "outro")
+
+
+@dataclass(frozen=True, slots=True)
+class Segment:
+    """One piece of a script; ``id`` comes from its content (topic, format, hook, CTA), not its position."""
+
+    id: str
+    kind: str
+    lines: Tuple[str, ...]
+    spoken: Tuple[str, ...]
+    topic: str = ""
+    format: str = ""
+    lesson: str = ""
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+    @property
+    def spoken_text(self) -> str:
+        return " ".join(self.spoken)
+
+
+@dataclass(frozen=True, slots=True)
+class Script:
+    mode: str
+    title: str
+    tags: str
+    text: str
+    segments: Tuple[Segment, ...]
+
+    @property
+    def spoken_text(self) -> str:
+        return " ".join(segment.spoken_text for segment in self.segments if segment.spoken)
+
+    def of_kind(self, kind: str) -> List[Segment]:
+        return [segment for segment in self.segments if segment.kind == kind]
+
+    def tts_units(self) -> List[Dict[str, object]]:
+        """Segments grouped into synthesis units: a lesson's hook and body are read as one."""
+        units: List[Dict[str, object]] = []
+        for segment in self.segments:
+            if not segment.spoken:
+                continue
+            if segment.lesson and units and units[-1]["id"] == segment.lesson:
+                units[-1]["sentences"] += list(segment.spoken)
+                continue
+            units.append(
+                {
+                    "id": segment.lesson or segment.id,
+                    "topic": segment.topic,
+                    "format": segment.format,
+                    "sentences": list(segment.spoken),
+                }
+            )
+        for unit in units:
+            unit["spoken"] = " ".join(unit["sentences"])
+        return units
+
+
+def lesson_id(topic_id: str, format_name: str, hook_variant: int) -> str:
+    return f"{topic_id}/{format_name}/h{hook_variant}"
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import os
+import re
+
+# Edge neural voices read this script at roughly 2.6 words/s at rate +0%.
+BASE_WORDS_PER_SEC = float(os.getenv("BASE_WORDS_PER_SEC", "2.6"))
+SENTENCE_PAUSE_SEC = 0.25
+
+
+def normalize_text(text: str) -> str:
+    replacements = {
+        "\u2019": "'",
+        "\u2018": "'",
+        "\u201c": '"',
+        "\u201d": '"',
+        "\u2014": "-",
+        "\u2013": "-",
+        "â€™": "'",
+        "â€œ": '"',
+        "â€\x9d": '"',
+        "â€“": "-",
+        "â€”": "-",
+        "Ã¢â‚¬â„¢": "'",
+        "Ã¢â‚¬Å“": '"',
+        "Ã¢â‚¬\x9d": '"',
+        "Ã¢â‚¬â€œ": "-",
+        "Ã¢â‚¬â€": "-",
+    }
+    normalized = text
+    for bad, good in replacements.items():
+        normalized = normalized.replace(bad, good)
+    normalized = re.sub(r"\s+", " ", normalized)
+    return normalized.strip()
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+
+def sentence_count(text: str) -> int:
+    return len([chunk for chunk in re.split(r"(?<=[.!?])\s+", text) if chunk.strip()])
+
+
+def rate_factor(rate: str) -> float:
+    """edge-tts rate string ("+4%", "-10%") as a speed multiplier."""
+    match = re.fullmatch(r"\s*([+-]?\d+(?:\.\d+)?)%\s*", rate or "")
+    return 1.0 + float(match.group(1)) / 100 if match else 1.0
+
+
+def predict_duration(spoken: str, words_per_sec: float = BASE_WORDS_PER_SEC, rate: str = "+0%") -> float:
+    return word_count(spoken) / (words_per_sec * rate_factor(rate)) + sentence_count(spoken) * SENTENCE_PAUSE_SEC
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+TOPICS_PATH = Path(os.getenv("TOPICS_PATH", "data/topics.jsonl"))
+# One index per topic file, so channels with their own corpus share the cache directory.
+TOPIC_DB_PATH = Path(os.getenv("SMBB_CACHE_DIR", "cache")) / f"{TOPICS_PATH.stem}.sqlite3"
+
+# Which topic fields each script format needs; a topic only serves the formats it can fill.
+FORMAT_FIELDS: Dict[str, tuple] = {
+    "money_mistake": ("mistake", "quick_tip"),
+    "myth_vs_reality": ("myth", "reality", "quick_tip"),
+    "quick_tip": ("quick_tip",),
+    "comparison": ("comparison",),
+    "rich_vs_poor_habit": ("rich_habit", "poor_habit"),
+    "money_alert": ("alert", "quick_tip"),
+    "simple_explainer": ("concept", "quick_tip"),
+    "mini_case": ("case", "quick_tip"),
+    "money_curiosity": ("curiosity", "quick_tip"),
+}
+TOPIC_FIELDS = {field for fields in FORMAT_FIELDS.values() for field in fields}
+
+SCHEMA = """
+CREATE TABLE topics (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    topic TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+CREATE TABLE topic_index (
+    key TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    PRIMARY KEY (key, pos)
+);
+CREATE TABLE index_counts (
+    key TEXT PRIMARY KEY,
+    n INTEGER NOT NULL
+);
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def topic_id(topic: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", topic.lower()).strip("-")
+
+
+def validate_topic(raw: Any) -> Dict[str, Any]:
+    if not isinstance(raw, dict):
+        raise ValueError("topic entry must be a JSON object")
+    topic = raw.get("topic")
+    if not isinstance(topic, str) or not topic.strip():
+        raise ValueError("missing 'topic'")
+
+    entry: Dict[str, Any] = {"id": str(raw.get("id") or topic_id(topic)), "topic": topic.strip()}
+    tags = raw.get("tags", [])
+    if not isinstance(tags, list) or not all(isinstance(tag, str) and tag.strip() for tag in tags):
+        raise ValueError("'tags' must be a list of non-empty strings")
+    entry["tags"] = sorted({tag.strip().lower() for tag in tags})
+
+    weight = raw.get("weight", 1.0)
+    if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight <= 0:
+        raise ValueError("'weight' must be a positive number")
+    entry["weight"] = float(weight)
+
+    for key, value in raw.items():
+        if key in ("id", "topic", "tags", "weight"):
+            continue
+        if key not in TOPIC_FIELDS:
+            raise ValueError(f"unknown field '{key}'")
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"field '{key}' must be a non-empty string")
+        entry[key] = value.strip()
+
+    if not supported_formats(entry):
+        raise ValueError("topic has too few fields to fill any format")
+    return entry
+
+
+def supported_formats(entry: Dict[str, Any]) -> List[str]:
+    return [name for name, fields in FORMAT_FIELDS.items() if all(entry.get(field) for field in fields)]
+
+
+def ingest(source: Path = TOPICS_PATH, db_path: Path = TOPIC_DB_PATH) -> int:
+    """Validate the JSONL corpus and rebuild the indexed database; returns the topic count."""
+    entries: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    seen_ids: Set[str] = set()
+    seen_topics: Set[str] = set()
+    with source.open(encoding="utf-8") as handle:
+        for line_no, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = validate_topic(json.loads(line))
+                if entry["id"] in seen_ids or entry["topic"] in seen_topics:
+                    raise ValueError(f"duplicate topic '{entry['id']}'")
+            except ValueError as exc:
+                errors.append(f"{source}:{line_no}: {exc}")
+                continue
+            seen_ids.add(entry["id"])
+            seen_topics.add(entry["topic"])
+            entries.append(entry)
+    if errors:
+        raise ValueError("Invalid topic corpus:\n" + "\n".join(errors))
+
+    index: Dict[str, List[int]] = {}
+    for row, entry in enumerate(entries, start=1):
+        keys = ["all"] + [f"format:{name}" for name in supported_formats(entry)]
+        keys += [f"tag:{tag}" for tag in entry["tags"]]
+        for key in keys:
+            index.setdefault(key, []).append(row)
+
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = db_path.with_suffix(".tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(str(tmp))
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO topics (row, id, topic, data) VALUES (?, ?, ?, ?)",
+            [(row, entry["id"], entry["topic"], json.dumps(entry)) for row, entry in enumerate(entries, start=1)],
+        )
+        conn.executemany(
+            "INSERT INTO topic_index (key, pos, row) VALUES (?, ?, ?)",
+            [(key, pos, row) for key, rows in index.items() for pos, row in enumerate(rows)],
+        )
+        conn.executemany("INSERT INTO index_counts (key, n) VALUES (?, ?)", [(k, len(v)) for k, v in index.items()])
+        conn.execute("INSERT INTO meta (key, value) VALUES ('source', ?)", (_source_stamp(source),))
+        conn.commit()
+    finally:
+        conn.close()
+    tmp.replace(db_path)
+    return len(entries)
+
+
+def _source_stamp(source: Path) -> str:
+    # Content hash, not mtime: every CI checkout gets fresh mtimes for an unchanged file.
+    return hashlib.sha256(source.read_bytes()).hexdigest()
+
+
+class TopicCorpus:
+    """Indexed topic lookup; the database is opened, and rebuilt if stale, on first use."""
+
+    def __init__(self, source: Path = TOPICS_PATH, db_path: Path = TOPIC_DB_PATH) -> None:
+        self.source = source
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if not self._is_current():
+                count = ingest(self.source, self.db_path)
+                print(f"Indexed {count} topics from {self.source}")
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        return self._conn
+
+    def _is_current(self) -> bool:
+        if not self.db_path.exists():
+            return False
+        try:
+            conn = sqlite3.connect(str(self.db_path))
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError:
+            return False
+        return bool(row) and row[0] == self.stamp()
+
+    def stamp(self) -> str:
+        """Identifies the current contents of the source file."""
+        return _source_stamp(self.source)
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> Optional[tuple]:
+        with self._lock:
+            return self._db().execute(sql, tuple(params)).fetchone()
+
+    def count(self, key: str = "all") -> int:
+        row = self._query("SELECT n FROM index_counts WHERE key = ?", (key,))
+        return int(row[0]) if row else 0
+
+    def get(self, topic_id: str) -> Optional[Dict[str, Any]]:
+        row = self._query("SELECT data FROM topics WHERE id = ?", (topic_id,))
+        return json.loads(row[0]) if row else None
+
+    def by_name(self, topic: str) -> Optional[Dict[str, Any]]:
+        row = self._query("SELECT data FROM topics WHERE topic = ?", (topic,))
+        return json.loads(row[0]) if row else None
+
+    def entries(self, key: str = "all") -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT t.data FROM topic_index i JOIN topics t ON t.row = i.row WHERE i.key = ? ORDER BY i.pos",
+                (key,),
+            ).fetchall()
+        for row in rows:
+            yield json.loads(row[0])
+
+    def _at(self, key: str, pos: int) -> Dict[str, Any]:
+        row = self._query(
+            "SELECT t.data FROM topic_index i JOIN topics t ON t.row = i.row WHERE i.key = ? AND i.pos = ?",
+            (key, pos),
+        )
+        return json.loads(row[0])
+
+    def sample(
+        self,
+        rng: random.Random,
+        format_name: str = "",
+        tag: str = "",
+        exclude: Optional[Set[str]] = None,
+        attempts: int = 8,
+    ) -> Dict[str, Any]:
+        """Random topic for ``format_name`` or ``tag``, avoiding ``exclude`` for up to ``attempts`` draws."""
+        if format_name and tag:
+            raise ValueError("Sample by format or by tag, not both")
+        key = f"format:{format_name}" if format_name else f"tag:{tag.lower()}" if tag else "all"
+        total = self.count(key)
+        if not total:
+            raise LookupError(f"No topics in {self.source} for {key}")
+
+        exclude = exclude or set()
+        entry: Dict[str, Any] = {}
+        for _ in range(attempts):
+            entry = self._at(key, rng.randrange(total))
+            if entry["topic"] not in exclude:
+                return entry
+        return entry
+
+
+_corpus: Optional[TopicCorpus] = None
+
+
+def get_corpus() -> TopicCorpus:
+    global _corpus
+    if _corpus is None:
+        _corpus = TopicCorpus()
+    return _corpus
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validate and index the topic corpus")
+    parser.add_argument("--source", default=str(TOPICS_PATH))
+    parser.add_argument("--db", default=str(TOPIC_DB_PATH))
+    args = parser.parse_args()
+
+    count = ingest(Path(args.source), Path(args.db))
+    print(f"Indexed {count} topics into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from history_store import HistoryStore, get_store
+from topic_corpus import FORMAT_FIELDS, TopicCorpus, get_corpus
+
+ROTATION_INTERVAL_SEC = float(os.getenv("ROTATION_INTERVAL_HOURS", "168")) * 3600
+TOPIC_COOLDOWN_SEC = float(os.getenv("TOPIC_COOLDOWN_HOURS", "48")) * 3600
+FORMAT_COOLDOWN_SEC = float(os.getenv("FORMAT_COOLDOWN_HOURS", "12")) * 3600
+MAX_SCAN = 64
+
+FORMAT_WEIGHTS: Dict[str, float] = {name: 1.0 for name in FORMAT_FIELDS}
+
+Pair = Tuple[str, str]
+
+
+class TopicScheduler:
+    """Serves the least-recently-used (topic, format) pair that is out of cooldown."""
+
+    # A pair is due ROTATION_INTERVAL_SEC / weight after its last use. Due times live in the history
+    # ledger's indexed rotation table and follow its picks, so a pick reads only the front of the
+    # rotation and the recent picks, and only recorded (accepted) scripts advance the rotation.
+
+    def __init__(self, corpus: Optional[TopicCorpus] = None, store: Optional[HistoryStore] = None) -> None:
+        self.corpus = corpus or get_corpus()
+        self.store = store or get_store()
+        self._lock = threading.Lock()
+        self._synced = False
+        self._jitter = random.Random(datetime.now(timezone.utc).strftime("%Y-%m-%d"))
+
+    def _stamp(self) -> str:
+        return f"{self.corpus.stamp()}:{ROTATION_INTERVAL_SEC}:{json.dumps(FORMAT_WEIGHTS, sort_keys=True)}"
+
+    def _rebuild(self, stamp: str) -> None:
+        last_id = self.store.last_pick_id()
+        last_used = self.store.last_used_by_pair()
+        rows = []
+        for format_name in FORMAT_FIELDS:
+            for entry in self.corpus.entries(f"format:{format_name}"):
+                weight = entry.get("weight", 1.0) * FORMAT_WEIGHTS[format_name]
+                used = last_used.get((entry["topic"], format_name), 0.0)
+                due = used + ROTATION_INTERVAL_SEC / weight
+                rows.append((entry["topic"], format_name, weight, used, due, self._jitter.random()))
+        self.store.replace_rotation(rows)
+        self.store.set_meta("rotation:pick_id", str(last_id))
+        self.store.set_meta("rotation:stamp", stamp)
+
+    def _sync(self) -> None:
+        if not self._synced:
+            stamp = self._stamp()
+            if self.store.get_meta("rotation:stamp") != stamp or self.store.get_meta("rotation:pick_id") is None:
+                self._rebuild(stamp)
+            self._synced = True
+        picks = self.store.picks_after(int(self.store.get_meta("rotation:pick_id") or 0))
+        for pick in picks:
+            self.store.use_rotation(
+                pick["topic"], pick["format"], pick["created"], ROTATION_INTERVAL_SEC, self._jitter.random()
+            )
+        if picks:
+            self.store.set_meta("rotation:pick_id", str(picks[-1]["id"]))
+
+    def last_used(self, pair: Pair) -> float:
+        """When ``pair`` was last recorded, or 0 if it never was."""
+        with self._lock:
+            self._sync()
+            return self.store.rotation_used(*pair)
+
+    def next_pair(self, taken: Iterable[Pair] = (), skip: Iterable[Pair] = ()) -> Pair:
+        """Best eligible pair other than ``taken`` (cooling as if just used) and ``skip``; nothing is recorded."""
+        taken = list(taken)
+        passed = set(taken) | set(skip)
+        with self._lock:
+            self._sync()
+            now = time.time()
+            topic_used = self.store.last_used_since("topic", now - TOPIC_COOLDOWN_SEC)
+            format_used = self.store.last_used_since("format", now - FORMAT_COOLDOWN_SEC)
+            front = self.store.rotation_front(MAX_SCAN + len(passed))
+        for topic, format_name in taken:
+            topic_used[topic] = format_used[format_name] = now
+
+        candidates = [row for row in front if (row["topic"], row["format"]) not in passed][:MAX_SCAN]
+        if not candidates:
+            raise LookupError("No topic/format pairs to schedule")
+        for row in candidates:
+            if row["topic"] not in topic_used and row["format"] not in format_used:
+                return row["topic"], row["format"]
+        # Everything near the front is cooling down; take the one whose topic rested longest.
+        chosen = min(candidates, key=lambda row: (topic_used.get(row["topic"], 0.0), row["due"]))
+        return chosen["topic"], chosen["format"]
+
+
+_scheduler: Optional[TopicScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> TopicScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TopicScheduler()
+        return _scheduler
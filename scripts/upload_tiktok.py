@@ -1,15 +1,19 @@
 from __future__ import annotations
 
+import argparse
 import json
 import os
-import subprocess
 import time
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 import requests
 
+from audio_analysis import media_duration
+from history_store import get_store
+from plan_gate import TIKTOK_LIMIT_META_KEY
 from validation import assert_ready_for_upload
+from workspace import Workspace
 
 API_BASE = "https://open.tiktokapis.com"
 CREATOR_INFO_ENDPOINT = f"{API_BASE}/v2/post/publish/creator_info/query/"
@@ -17,23 +21,6 @@ VIDEO_INIT_ENDPOINT = f"{API_BASE}/v2/post/publish/video/init/"
 STATUS_ENDPOINT = f"{API_BASE}/v2/post/publish/status/fetch/"
 
 
-def ffprobe_duration(path: Path) -> float:
-    out = subprocess.check_output(
-        [
-            "ffprobe",
-            "-v",
-            "error",
-            "-show_entries",
-            "format=duration",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            str(path),
-        ],
-        text=True,
-    ).strip()
-    return float(out)
-
-
 def load_meta(path: Path) -> str:
     if not path.exists():
         return ""
@@ -177,23 +164,39 @@ def wait_for_terminal_status(access_token: str, publish_id: str) -> Dict[str, An
 
 
 def main() -> None:
-    assert_ready_for_upload()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--job", default=None, help="Upload from jobs/<id>/ instead of out/")
+    parser.add_argument(
+        "--variant",
+        default=os.getenv("TIKTOK_VARIANT", ""),
+        help="Upload video_<variant>.mp4 (see VIDEO_VARIANTS) instead of video.mp4",
+    )
+    parser.add_argument("--voice", default="", help="Upload the render of one of VOICE_VARIANTS")
+    args = parser.parse_args()
+
+    workspace = Workspace.from_env(args.job)
+    if args.voice:
+        workspace = workspace.for_voice(args.voice)
+    assert_ready_for_upload(workspace)
 
     access_token = os.getenv("TIKTOK_ACCESS_TOKEN", "").strip()
     if not access_token:
         raise RuntimeError("Missing TIKTOK_ACCESS_TOKEN")
 
-    video_path = Path("out/video.mp4")
+    video_path = workspace.variant_video(args.variant) if args.variant else workspace.video
     if not video_path.exists():
-        raise FileNotFoundError("Missing out/video.mp4")
+        raise FileNotFoundError(f"Missing {video_path}")
 
-    title = load_meta(Path("meta_title.txt"))
+    title = load_meta(workspace.meta_title)
     if not title:
         title = "Daily finance short"
 
     creator_info = get_creator_info(access_token)
     max_duration = int(creator_info.get("max_video_post_duration_sec") or 0)
-    video_sec = ffprobe_duration(video_path)
+    if max_duration:
+        # The planning gate reads this back so the next script is sized before any TTS.
+        get_store().set_meta(TIKTOK_LIMIT_META_KEY, str(max_duration))
+    video_sec = media_duration(video_path)
     if max_duration and video_sec > max_duration:
         raise RuntimeError(
             f"Video duration ({video_sec:.2f}s) exceeds creator max ({max_duration}s)."
@@ -209,6 +212,15 @@ def main() -> None:
     status_data = wait_for_terminal_status(access_token, publish_id)
     print("TikTok publish_id:", publish_id)
     print("TikTok status:", json.dumps(status_data, ensure_ascii=False))
+    get_store().record_upload(
+        "tiktok",
+        publish_id,
+        str(status_data.get("status", "")),
+        workspace.job_id,
+        title=safe_title,
+        variant=args.variant,
+        voice=args.voice,
+    )
 
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import argparse
 import json
 import os
 from pathlib import Path
@@ -8,7 +9,9 @@ from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 
+from history_store import get_store
 from validation import assert_ready_for_upload
+from workspace import Workspace
 
 SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
 
@@ -19,15 +22,31 @@ def require_file(path: Path) -> None:
 
 
 def main() -> None:
-    assert_ready_for_upload()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--job", default=None, help="Upload from jobs/<id>/ instead of out/")
+    parser.add_argument(
+        "--variant",
+        default=os.getenv("YOUTUBE_VARIANT", ""),
+        help="Upload video_<variant>.mp4 (see VIDEO_VARIANTS) instead of video.mp4",
+    )
+    parser.add_argument("--voice", default="", help="Upload the render of one of VOICE_VARIANTS")
+    args = parser.parse_args()
+
+    workspace = Workspace.from_env(args.job)
+    if args.voice:
+        workspace = workspace.for_voice(args.voice)
+    assert_ready_for_upload(workspace)
 
     refresh_token = os.environ["YOUTUBE_REFRESH_TOKEN"]
-    data = json.loads(Path("client_secret.json").read_text(encoding="utf-8"))
+    secret_file = os.getenv("YOUTUBE_CLIENT_SECRET_FILE", "client_secret.json").strip()
+    if not refresh_token or not secret_file:
+        raise RuntimeError("No YouTube credentials configured for this channel")
+    data = json.loads(Path(secret_file).read_text(encoding="utf-8"))
     installed = data["installed"]
 
-    title_path = Path("meta_title.txt")
-    desc_path = Path("meta_desc.txt")
-    video_path = Path("out/video.mp4")
+    title_path = workspace.meta_title
+    desc_path = workspace.meta_desc
+    video_path = workspace.variant_video(args.variant) if args.variant else workspace.video
 
     require_file(title_path)
     require_file(desc_path)
@@ -62,6 +81,9 @@ def main() -> None:
 
     response = request.execute()
     print("Uploaded:", response["id"])
+    get_store().record_upload(
+        "youtube", response["id"], "uploaded", workspace.job_id, title=title, variant=args.variant, voice=args.voice
+    )
 
 
 if __name__ == "__main__":
@@ -4,51 +4,45 @@ import argparse
 import json
 import subprocess
 from pathlib import Path
-from typing import Dict, List
-
-ROOT = Path(".")
-OUT_DIR = ROOT / "out"
-REPORT_PATH = OUT_DIR / "validation_report.json"
-
-
-def ffprobe_duration(path: Path) -> float:
-    output = subprocess.check_output(
-        [
-            "ffprobe",
-            "-v",
-            "error",
-            "-show_entries",
-            "format=duration",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            str(path),
-        ],
-        text=True,
-    ).strip()
-    return float(output)
+from typing import Dict, List, Optional, Tuple
+
+from audio_analysis import analyze, media_duration
+from ffmpeg_governor import get_governor
+from render_profiles import OUTPUT_VARIANTS, RENDER_PROFILES
+from run_report import read_run_report
+from workspace import Workspace
+
+
+MAX_CLIPPED_RATIO = 0.001
+MAX_LEAD_SILENCE_SEC = 1.0
+MAX_TRAIL_SILENCE_SEC = 2.5
+MIN_RMS_DBFS = -40.0
 
 
 def black_ratio(path: Path, duration: float) -> float:
     if duration <= 0:
         return 1.0
 
-    proc = subprocess.run(
-        [
-            "ffmpeg",
-            "-hide_banner",
-            "-i",
-            str(path),
-            "-vf",
-            "blackdetect=d=0.12:pic_th=0.92:pix_th=0.10",
-            "-an",
-            "-f",
-            "null",
-            "-",
-        ],
-        capture_output=True,
-        text=True,
-        check=False,
-    )
+    with get_governor().slot("decode", path.name) as budget:
+        proc = subprocess.run(
+            [
+                "ffmpeg",
+                "-hide_banner",
+                *budget.global_args(),
+                *budget.codec_args(),
+                "-i",
+                str(path),
+                "-vf",
+                "blackdetect=d=0.12:pic_th=0.92:pix_th=0.10",
+                "-an",
+                "-f",
+                "null",
+                "-",
+            ],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
     stderr = proc.stderr or ""
 
     total_black = 0.0
@@ -75,39 +69,64 @@ def _append_error(errors: List[str], msg: str) -> None:
         errors.append(msg)
 
 
-def validate_artifacts(strict: bool = True) -> Dict[str, object]:
+def check_text(script: str, title: str, description: str) -> Tuple[List[str], List[str]]:
+    """Checks that need only the composed text; shared with the pre-TTS planning gate."""
     errors: List[str] = []
     warnings: List[str] = []
-
-    script_text = read_text(OUT_DIR / "script.txt")
-    title = read_text(ROOT / "meta_title.txt")
-    description = read_text(ROOT / "meta_desc.txt")
-
-    if len(script_text.split()) < 35:
-        _append_error(errors, "Script is too short or empty.")
+    if len(script.split()) < 35:
+        errors.append("Script is too short or empty.")
     if len(title) < 12:
-        _append_error(errors, "Title is too short.")
+        errors.append("Title is too short.")
     if "#shorts" not in description.lower():
         warnings.append("Description does not include #shorts.")
+    return errors, warnings
+
+
+def validate_artifacts(strict: bool = True, workspace: Optional[Workspace] = None) -> Dict[str, object]:
+    workspace = workspace or Workspace.from_env()
+    errors: List[str] = []
+    warnings: List[str] = []
+
+    script_text = read_text(workspace.script)
+    title = read_text(workspace.meta_title)
+    description = read_text(workspace.meta_desc)
+
+    text_errors, text_warnings = check_text(script_text, title, description)
+    for msg in text_errors:
+        _append_error(errors, msg)
+    warnings.extend(text_warnings)
 
-    audio_path = OUT_DIR / "audio.mp3"
-    video_path = OUT_DIR / "video.mp4"
+    audio_path = workspace.audio
+    video_path = workspace.video
 
-    for required in [audio_path, video_path, ROOT / "meta_title.txt", ROOT / "meta_desc.txt"]:
+    for required in [audio_path, video_path, workspace.meta_title, workspace.meta_desc]:
         if not required.exists():
             _append_error(errors, f"Missing required file: {required}")
 
     audio_seconds = 0.0
+    audio_metrics: Dict[str, float] = {}
     video_seconds = 0.0
     video_black_ratio = 1.0
 
     if audio_path.exists():
-        audio_seconds = ffprobe_duration(audio_path)
+        audio_metrics = dict(analyze(audio_path))
+        spoken_words = len(read_text(workspace.spoken_script).split())
+        if spoken_words and audio_metrics["speech_sec"] > 0:
+            audio_metrics["words_per_sec"] = round(spoken_words / audio_metrics["speech_sec"], 2)
+        audio_seconds = audio_metrics["duration_sec"]
         if audio_seconds < 4.0:
             _append_error(errors, f"Audio is too short ({audio_seconds:.2f}s).")
+        if audio_metrics["rms_dbfs"] < MIN_RMS_DBFS:
+            _append_error(errors, f"Audio is nearly silent ({audio_metrics['rms_dbfs']:.1f} dBFS RMS).")
+        if audio_metrics["clipped_ratio"] > MAX_CLIPPED_RATIO:
+            warnings.append(f"Audio clips on {audio_metrics['clipped_ratio']:.2%} of samples.")
+        if audio_metrics["lead_silence_sec"] > MAX_LEAD_SILENCE_SEC:
+            warnings.append(f"Audio starts with {audio_metrics['lead_silence_sec']:.1f}s of silence.")
+        if audio_metrics["trail_silence_sec"] > MAX_TRAIL_SILENCE_SEC:
+            warnings.append(f"Audio ends with {audio_metrics['trail_silence_sec']:.1f}s of silence.")
 
     if video_path.exists():
-        video_seconds = ffprobe_duration(video_path)
+        video_seconds = media_duration(video_path)
         if video_seconds < 4.0:
             _append_error(errors, f"Video is too short ({video_seconds:.2f}s).")
 
@@ -126,6 +145,38 @@ def validate_artifacts(strict: bool = True) -> Dict[str, object]:
                 f"Video likely too dark/black (black ratio {video_black_ratio:.2%}).",
             )
 
+    run_info = read_run_report(workspace.run_report)
+    profile_name = str(run_info.get("render_profile", {}).get("name", ""))
+    video_bytes_per_sec = 0.0
+
+    if video_path.exists() and video_seconds > 0:
+        video_bytes_per_sec = video_path.stat().st_size / video_seconds
+        profile = RENDER_PROFILES.get(profile_name)
+        if profile and not profile.within_budget(video_path.stat().st_size, video_seconds):
+            warnings.append(
+                f"Video bitrate {video_bytes_per_sec:,.0f} B/s exceeds the '{profile_name}' "
+                f"budget of {profile.max_bytes_per_sec:,} B/s."
+            )
+
+    variant_metrics: Dict[str, Dict[str, float]] = {}
+    for name, variant in OUTPUT_VARIANTS.items():
+        path = workspace.variant_video(name)
+        if not path.exists():
+            continue
+        seconds = media_duration(path)
+        size = path.stat().st_size
+        if seconds < 4.0:
+            _append_error(errors, f"Variant {name} is too short ({seconds:.2f}s).")
+        elif not variant.encoder.within_budget(size, seconds):
+            warnings.append(
+                f"Variant {name} bitrate {size / seconds:,.0f} B/s exceeds the '{variant.profile}' "
+                f"budget of {variant.encoder.max_bytes_per_sec:,} B/s."
+            )
+        variant_metrics[name] = {
+            "seconds": round(seconds, 3),
+            "bytes_per_sec": round(size / seconds) if seconds > 0 else 0,
+        }
+
     ok = len(errors) == 0
     result = {
         "ok": ok,
@@ -137,11 +188,16 @@ def validate_artifacts(strict: bool = True) -> Dict[str, object]:
             "video_seconds": round(video_seconds, 3),
             "video_black_ratio": round(video_black_ratio, 4),
             "script_word_count": len(script_text.split()),
+            "audio": audio_metrics,
+            "video_bytes_per_sec": round(video_bytes_per_sec),
+            "variants": variant_metrics,
         },
+        "render_profile": profile_name or "unknown",
+        "run": run_info,
     }
 
-    OUT_DIR.mkdir(exist_ok=True)
-    REPORT_PATH.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    workspace.root.mkdir(parents=True, exist_ok=True)
+    workspace.validation_report.write_text(json.dumps(result, indent=2), encoding="utf-8")
 
     if strict and not ok:
         raise RuntimeError("Validation failed: " + " | ".join(errors))
@@ -149,16 +205,26 @@ def validate_artifacts(strict: bool = True) -> Dict[str, object]:
     return result
 
 
-def assert_ready_for_upload() -> Dict[str, object]:
-    return validate_artifacts(strict=True)
+def attach_run_report(workspace: Optional[Workspace] = None) -> None:
+    workspace = workspace or Workspace.from_env()
+    if not workspace.validation_report.exists():
+        return
+    result = json.loads(workspace.validation_report.read_text(encoding="utf-8"))
+    result["run"] = read_run_report(workspace.run_report)
+    workspace.validation_report.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+
+def assert_ready_for_upload(workspace: Optional[Workspace] = None) -> Dict[str, object]:
+    return validate_artifacts(strict=True, workspace=workspace)
 
 
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--strict", action="store_true", help="Fail process on validation errors")
+    parser.add_argument("--job", default=None, help="Validate jobs/<id>/ instead of out/")
     args = parser.parse_args()
 
-    result = validate_artifacts(strict=args.strict)
+    result = validate_artifacts(strict=args.strict, workspace=Workspace.from_env(args.job))
     print(json.dumps(result, indent=2))
 
 
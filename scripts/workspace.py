@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import os
+import re
+import shutil
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Optional
+
+JOBS_DIR = Path("jobs")
+LEGACY_OUT_DIR = Path("out")
+TMPFS_ROOT = Path("/dev/shm/smbb")
+
+
+@dataclass(frozen=True)
+class Workspace:
+    """Where one job keeps its artifacts and scratch files; no job id means the historical out/ layout."""
+
+    root: Path
+    scratch: Path
+    meta_dir: Path
+    job_id: str = ""
+
+    @classmethod
+    def create(cls, job_id: str = "", scratch_base: str = "") -> "Workspace":
+        job_id = re.sub(r"[^A-Za-z0-9_.-]", "_", job_id.strip())
+        if job_id:
+            root = JOBS_DIR / job_id
+            meta_dir = root
+        else:
+            root = LEGACY_OUT_DIR
+            meta_dir = Path(".")
+
+        scratch_base = scratch_base.strip()
+        if scratch_base == "tmpfs":
+            scratch = TMPFS_ROOT / (job_id or "default")
+        elif scratch_base:
+            scratch = Path(scratch_base) / (job_id or "default")
+        else:
+            scratch = root
+
+        workspace = cls(root=root, scratch=scratch, meta_dir=meta_dir, job_id=job_id)
+        workspace.root.mkdir(parents=True, exist_ok=True)
+        workspace.scratch.mkdir(parents=True, exist_ok=True)
+        return workspace
+
+    @classmethod
+    def from_env(cls, job_id: Optional[str] = None) -> "Workspace":
+        return cls.create(
+            job_id if job_id is not None else os.getenv("SMBB_JOB_ID", ""),
+            os.getenv("SMBB_SCRATCH_DIR", ""),
+        )
+
+    def for_voice(self, voice: str) -> "Workspace":
+        """Audio, captions and video of one extra voice; title and description stay shared."""
+        slug = re.sub(r"[^A-Za-z0-9_.-]", "_", voice.strip())
+        workspace = replace(self, root=self.root / "voices" / slug, scratch=self.scratch / "voices" / slug)
+        workspace.root.mkdir(parents=True, exist_ok=True)
+        workspace.scratch.mkdir(parents=True, exist_ok=True)
+        return workspace
+
+    def work(self, name: str) -> Path:
+        return self.scratch / name
+
+    @property
+    def has_separate_scratch(self) -> bool:
+        return self.scratch.resolve() != self.root.resolve()
+
+    @property
+    def audio(self) -> Path:
+        return self.root / "audio.mp3"
+
+    @property
+    def video(self) -> Path:
+        return self.root / "video.mp4"
+
+    def variant_video(self, name: str) -> Path:
+        return self.root / f"video_{name}.mp4"
+
+    @property
+    def script(self) -> Path:
+        return self.root / "script.txt"
+
+    @property
+    def spoken_script(self) -> Path:
+        return self.root / "spoken_script.txt"
+
+    @property
+    def captions(self) -> Path:
+        return self.root / "captions.srt"
+
+    @property
+    def meta_title(self) -> Path:
+        return self.meta_dir / "meta_title.txt"
+
+    @property
+    def meta_desc(self) -> Path:
+        return self.meta_dir / "meta_desc.txt"
+
+    @property
+    def run_report(self) -> Path:
+        return self.root / "run_report.json"
+
+    @property
+    def run_manifest(self) -> Path:
+        return self.root / "run_manifest.json"
+
+    @property
+    def validation_report(self) -> Path:
+        return self.root / "validation_report.json"
+
+    def cleanup_scratch(self) -> None:
+        if self.has_separate_scratch:
+            shutil.rmtree(self.scratch, ignore_errors=True)